@@ -0,0 +1,272 @@
+import itertools
+import json
+
+from Lexer import Token
+
+#Schema of every AST node kind, base name -> fields in log order.
+#Node classes with __slots__ are generated from it. The parser builds
+#nodes with BaseAST(base, dict) and visitors dispatch on the generated
+#visitName/compileName of the node class. Comments are not stored on
+#nodes, the FILE node holds a commentTable of node -> comment tokens.
+
+# Expression results can carry units, set after the expression is loaded
+exprFields = ['units', 'type']
+
+# Assignment and report statements share fields between bases
+asgnFields    = ['leftVar', 'op', 'rightExpr']
+reportFields  = ['str']
+processFields = ['params', 'statements']
+
+astSchema = {
+  # File and top level declarations
+  'FILE':        ['filename', 'name', 'importName', 'nodes'],
+  'IMPORT':      ['load', 'name'],
+  'LIBRARY':     ['name', 'nodes'],
+  'STRUCT':      ['name', 'generics', 'params', 'fieldNodes'],
+  'INTERFACE':   ['name', 'generics', 'params', 'fieldNodes'],
+  'TRAIT':       ['name', 'generics', 'nodes'],
+  'IMPL':        ['outGeneric', 'name', 'typeGeneric', 'traitImpl', 'traitName', 'traitGeneric', 'nodes'],
+  'ENUM':        ['name', 'states'],
+  'ATTR':        ['type', 'spec'],
+  'ATTRSPEC':    ['name', 'value'],
+  'FUNCTION':    ['name', 'generics', 'params', 'returnType', 'funcDef', 'declareBlock', 'logicBlock'],
+  'TASK':        ['name', 'generics', 'params', 'returnType', 'taskDef', 'declareBlock', 'logicBlock'],
+  'MODULE':      ['name', 'generics', 'blackbox', 'genDeclNodes', 'portDeclNodes'],
+  'ARCH':        ['name', 'archGenerics', 'module', 'modGenerics', 'declareBlock', 'logicBlock'],
+  
+  # Declarations and types
+  'DECLARE':     ['declNodes'],
+  'DECL':        ['const', 'typeName', 'typeGenerics', 'params', 'decl', 'array', 'generic', 'port', 'name', 'value'],
+  'FIELD':       ['const', 'typeName', 'typeGenerics', 'params', 'decl', 'array', 'generic', 'port', 'name', 'value'],
+  'PARAM':       ['type', 'generics', 'dim', 'name', 'value'],
+  'GENTYPE':     ['name', 'typeBound', 'defaultType'],
+  'TYPE':        ['name', 'type', 'generics', 'dim'],
+  
+  # Logic statements
+  'LOGIC':       ['statements'],
+  'SPRO':        processFields,
+  'APRO':        processFields,
+  'PRO':         processFields,
+  'FOR':         ['ind', 'iter', 'statements'],
+  'IF':          ['arg', 'statements', 'elif', 'else'],
+  'ELIF':        ['arg', 'statements'],
+  'ELSE':        ['statements'],
+  'CASE':        ['arg', 'choices'],
+  'CHOICE':      ['choice', 'statements'],
+  'ASSIGN':              asgnFields,
+  'CMPD_ARITH_ASSIGN':   asgnFields,
+  'CMPD_LOGICAL_ASSIGN': asgnFields,
+  'POST_OPER':           asgnFields,
+  'MODULE_INST': ['name', 'module', 'generics', 'arch', 'gens', 'ports'],
+  'GEN_ASSIGN':  ['gen', 'var'],
+  'PORT_ASSIGN': ['port', 'var'],
+  'RETURN':      ['vars'],
+  'RENAME':      ['var', 'name'],
+  'ASSERT':      ['condition', 'status'],
+  'PRINT':       reportFields,
+  'WARNING':     reportFields,
+  'ERROR':       reportFields,
+  
+  # Expressions
+  'EXPR':        ['op', 'params'] + exprFields,
+  'CAT':         ['op', 'params'] + exprFields,
+  'FUNCCALL':    ['name', 'generics', 'params', 'method'] + exprFields,
+  'VAR':         ['name', 'decl', 'array', 'field', 'method'] + exprFields,
+  'CONST':       ['token', 'typeName', 'params', 'value', 'name', 'const', 'port', 'decl'] + exprFields,
+  'CONST_ARRAY': ['typeName', 'params', 'value', 'name', 'const', 'port', 'decl'] + exprFields,
+  'BITS':        ['token', 'typeName', 'params', 'width', 'value', 'mask', 'states', 'name', 'const', 'port', 'decl'] + exprFields,
+  'AGGREGATE':   ['elem', 'nodes'] + exprFields,
+  'ELEM':        ['left', 'right'],
+  'OTHERS':      [],
+}
+
+# Slots that are not logged as fields
+astSlots = {
+  'FILE':        ['commentTable'],
+}
+
+# Marks fields that were never set, they are skipped in logs
+unset = object()
+
+def iterList(val, ind):
+  # Yield (index string, item) of a nested list in order
+  for d in range(len(val)):
+    if (type(val[d]) is list):
+      yield from iterList(val[d], ind + [d])
+    else:
+      yield (str(ind + [d]), val[d])
+
+#Create an abstract class for abstract-syntax tree (AST). BaseAST(base, ...)
+#returns an instance of the node class generated for base.
+class BaseAST(object):
+  __slots__ = ()
+  base        = None
+  fields      = ()
+  visitName   = None
+  compileName = None
+  
+  def __new__(cls, base=None, grammerDict=None):
+    # Copy and pickle create the node class directly, without arguments
+    if (cls is BaseAST) and (base is not None):
+      if (base not in astClasses):
+        raise Exception('AST: Node base "{0}" not in schema'.format(base))
+      cls = astClasses[base]
+    return object.__new__(cls)
+  
+  def __init__(self, base, grammerDict):
+    #Add variables based on dict values
+    for var, val in iter(grammerDict.items()):
+      setattr(self, var, val)
+  
+  def log(self,tabLevel=0):
+    return list(self.iterLog(tabLevel))
+  
+  def dump(self, sink, jsonLines=False):
+    # Stream log lines, or one JSON object per node, to a file-like sink
+    lines = self.iterJson() if jsonLines else self.iterLog()
+    for line in lines:
+      sink.write(line)
+      sink.write('\n')
+  
+  def getCommentTable(self, commentTable):
+    # Logs of a FILE node use its own table
+    if (commentTable is None) and (self.base == 'FILE'):
+      return getattr(self, 'commentTable', None)
+    return commentTable
+  
+  def iterLog(self, tabLevel=0, label='', commentTable=None):
+    # Yield log lines, label names the field when logged as a child
+    commentTable = self.getCommentTable(commentTable)
+    indent = tabLevel*' '
+    if (self.base == 'CONST'):
+      yield (indent + label if label else '') + self.logConst()
+      return
+    elif (self.base == 'BITS'):
+      yield '{0}{1}BITS bit[{2}] = b\'{3}\''.format(indent, label, self.width, bitString(self))
+      return
+    
+    yield indent + label + self.base
+    tabLevel += 2
+    indent = tabLevel*' '
+    comments = commentTable.get(self, []) if commentTable else []
+    yield '{0}{1}: {2}'.format(indent, 'comments', list(comments))
+    
+    # Attributes are logged before child nodes
+    for (var, ind, val) in self.iterFields():
+      if not isinstance(val, BaseAST):
+        yield '{0}{1}{2}: {3}'.format(indent, var, ind, val)
+    
+    for (var, ind, val) in self.iterFields():
+      if isinstance(val, BaseAST):
+        yield from val.iterLog(tabLevel, '{0}{1}: '.format(var, ind), commentTable)
+  
+  def iterNodes(self):
+    # Yield this node and all nodes below it, depth first
+    yield self
+    for (var, ind, val) in self.iterFields():
+      if isinstance(val, BaseAST):
+        yield from val.iterNodes()
+  
+  def iterFields(self):
+    # Yield (field, index, value) of set fields, lists are flattened and
+    # index is the position in the list as a string
+    for var in self.fields:
+      val = getattr(self, var, unset)
+      if (val is unset):
+        continue
+      
+      if (type(val) is list):
+        for (ind, item) in iterList(val, []):
+          yield (var, ind, item)
+      else:
+        yield (var, '', val)
+  
+  def iterJson(self, counter=None, nodeId=0, parentId=None, commentTable=None):
+    # Yield one compact JSON object per node in depth first order.
+    # Child nodes are replaced by {"node": id} in their parent's fields.
+    if counter is None:
+      counter = itertools.count(1)
+    commentTable = self.getCommentTable(commentTable)
+    
+    children = []
+    def jsonValue(val):
+      if isinstance(val, BaseAST):
+        childId = next(counter)
+        children.append((val, childId))
+        return {'node': childId}
+      elif isinstance(val, (list, tuple)):
+        return [jsonValue(x) for x in val]
+      elif isinstance(val, dict):
+        return {str(key): jsonValue(x) for (key, x) in val.items()}
+      elif isinstance(val, Token):
+        return val.value
+      elif isinstance(val, (str, int, float, bool)) or (val is None):
+        return val
+      elif hasattr(val, 'tolist'):
+        return val.tolist()
+      else:
+        return str(val)
+    
+    record = {'id': nodeId, 'parent': parentId, 'base': self.base}
+    if commentTable and (self in commentTable):
+      record['comments'] = jsonValue(commentTable[self])
+    for var in self.fields:
+      val = getattr(self, var, unset)
+      if (val is not unset):
+        record[var] = jsonValue(val)
+    yield json.dumps(record, separators=(',', ':'))
+    
+    for (child, childId) in children:
+      yield from child.iterJson(counter, childId, nodeId, commentTable)
+  
+  def logConst(self):
+    # special case for const to reduce lines down
+    base = self.base
+    type = self.typeName
+    typeParam = self.params
+    typeParam = str(typeParam)[1:-1]
+    value = self.value
+    return '{0} {1}({2}) = {3}'.format(base, type, typeParam, value)
+
+#Packed bit-vector literal. Bit i of value is bit i of the literal, mask
+#marks bits that are not 0/1 and states holds their Z/X/L/H/- character.
+binaryTable = str.maketrans('ZXLH-', '00000')
+maskTable   = str.maketrans('01ZXLH-', '0011111')
+
+def packBits(binStr):
+  # Pack MSB first string of 01ZXLH- into (value, mask, states)
+  width = len(binStr)
+  value = int(binStr.translate(binaryTable), 2)
+  mask  = int(binStr.translate(maskTable), 2)
+  states = {}
+  if mask:
+    states = {width-1-ind: bit for ind, bit in enumerate(binStr) if bit not in '01'}
+  return (value, mask, states)
+
+def bitString(node):
+  # Unpack BITS node to MSB first string
+  binStr = format(node.value, '0{0}b'.format(node.width))
+  if not node.mask:
+    return binStr
+  
+  binList = list(binStr)
+  for ind, bit in node.states.items():
+    binList[node.width-1-ind] = bit
+  return ''.join(binList)
+
+def createNodeClass(base, fields):
+  # Generate slotted node class for one schema entry
+  classDict = {
+    '__slots__':   tuple(fields + astSlots.get(base, [])),
+    'base':        base,
+    'fields':      tuple(fields),
+    'visitName':   'visit_' + base.lower(),
+    'compileName': 'compile_' + base.lower(),
+  }
+  return type(base.title().replace('_', '') + 'AST', (BaseAST,), classDict)
+
+astClasses = {base: createNodeClass(base, fields) for base, fields in astSchema.items()}
+
+# Node classes are module attributes so trees can be pickled
+for nodeClass in astClasses.values():
+  globals()[nodeClass.__name__] = nodeClass
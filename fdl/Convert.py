@@ -1,4 +1,5 @@
 from NodeVisitor import NodeVisitor
+from ASTSchema import bitString
 
 def addScope(origStr,scope):
   strList = origStr.splitlines()
@@ -200,6 +201,21 @@ class Convert (NodeVisitor):
     # Number, return values
     return VarSymbol(None,node.type,node.const,node.array,node.value)
     
+  def visit_const_array(self, node):
+    # Positional VHDL aggregate of the constant values. A single element
+    # needs a named choice, (5) is only a parenthesized expression.
+    values = node.value.tolist()
+    if (len(values) == 1):
+      return '(0 => {0})'.format(values[0])
+    return '({0})'.format(', '.join(str(x) for x in values))
+    
+  def visit_bits(self, node):
+    # Bit-vector literal, hex when all bits are 0/1 and fit in digits
+    if ((node.mask == 0) and (node.width % 4 == 0)):
+      return 'x"{0:0{1}X}"'.format(node.value, node.width//4)
+    else:
+      return '"{0}"'.format(bitString(node))
+    
   def visit_var(self, node):
     # Replace array indicies with values 
     self.checkArray(node)
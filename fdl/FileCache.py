@@ -0,0 +1,52 @@
+import hashlib
+import os
+import pickle
+import threading
+
+#Pickled objects in a cache directory, named by a content key. Missing,
+#stale or unreadable entries are a miss, write errors only skip caching.
+class FileCache(object):
+  def __init__(self, cacheDir):
+    self.cacheDir = cacheDir
+  
+  @staticmethod
+  def key(*parts):
+    # Hash str/bytes parts into one hex key
+    h = hashlib.sha256()
+    for part in parts:
+      if isinstance(part, str):
+        part = part.encode('utf-8')
+      h.update(part)
+      h.update(b'\0')
+    return h.hexdigest()
+  
+  def getPath(self, name):
+    return os.path.join(self.cacheDir, name + '.pickle')
+  
+  def load(self, name):
+    try:
+      fo = open(self.getPath(name), 'rb')
+      obj = pickle.load(fo)
+      fo.close()
+    except Exception:
+      return None
+    
+    return obj
+  
+  def store(self, name, obj):
+    # Write to a temp file per process and thread first, so readers never
+    # see partial files
+    cacheFile = self.getPath(name)
+    tmpFile = '{0}.{1}.{2}.tmp'.format(cacheFile, os.getpid(), threading.get_ident())
+    try:
+      os.makedirs(self.cacheDir, exist_ok=True)
+      fo = open(tmpFile, 'wb')
+      try:
+        pickle.dump(obj, fo, pickle.HIGHEST_PROTOCOL)
+      finally:
+        fo.close()
+      os.replace(tmpFile, cacheFile)
+    except (OSError, pickle.PicklingError, RecursionError) as e:
+      print('Cache entry "{0}" not written: {1}'.format(name, e))
+      if os.path.exists(tmpFile):
+        os.remove(tmpFile)
@@ -0,0 +1,153 @@
+import re
+
+from FileCache import FileCache
+
+# Bump when the layout of the compiled tables changes, old cache
+# files are then ignored
+GRAMMAR_VERSION = 2
+
+#Read-only dict for grammar tables shared between lexers and analyzers
+class FrozenDict(dict):
+  def readOnly(self, *args, **kwargs):
+    raise TypeError('Grammar tables are read-only')
+  
+  __setitem__ = readOnly
+  __delitem__ = readOnly
+  clear       = readOnly
+  pop         = readOnly
+  popitem     = readOnly
+  setdefault  = readOnly
+  update      = readOnly
+  
+  def __reduce__(self):
+    return (FrozenDict, (dict(self),))
+
+def freeze(value):
+  # Recursively convert dicts and lists from YAML to read-only types
+  if isinstance(value, dict):
+    return FrozenDict((key, freeze(val)) for key, val in value.items())
+  elif isinstance(value, list):
+    return tuple(freeze(val) for val in value)
+  else:
+    return value
+
+#Validated and compiled form of the grammar YAML. Items of the YAML
+#are still read with grammar['key'], compiled tables are attributes.
+class Grammar(object):
+  def __init__(self, config, digest=None):
+    self.config = freeze(config)
+    
+    # Grammar built from a dict is keyed by its contents
+    if digest is None:
+      digest = FileCache.key(repr(self.config))
+    self.digest = digest
+    
+    self.validate()
+    self.compile()
+  
+  def __getitem__(self, key):
+    return self.config[key]
+  
+  def __contains__(self, key):
+    return key in self.config
+  
+  @staticmethod
+  def load(filename, cacheDir='.fdlcache'):
+    # Load grammar from cache, keyed by YAML content hash. YAML is only
+    # parsed and validated when the cache misses, the token regex is
+    # compiled again on every load.
+    fo = open(filename, 'rb')
+    data = fo.read()
+    fo.close()
+    digest = FileCache.key(data)
+    
+    cache = None
+    if cacheDir is not None:
+      cache = FileCache(cacheDir)
+      cacheName = 'grammar-v{0}-{1}'.format(GRAMMAR_VERSION, digest)
+      grammar = cache.load(cacheName)
+      if (isinstance(grammar, Grammar) and (grammar.digest == digest)):
+        return grammar
+    
+    import yaml
+    grammar = Grammar(yaml.safe_load(data.decode('utf-8')), digest)
+    
+    if cache is not None:
+      cache.store(cacheName, grammar)
+    
+    return grammar
+  
+  def validate(self):
+    # Verify sections used by lexer and semantic analyzer
+    for section in ['tokens', 'keywords', 'types', 'builtinMethod']:
+      if section not in self.config:
+        raise Exception('Grammar: Missing section "{0}"'.format(section))
+    
+    for token in self.config['tokens'] + self.config['keywords']:
+      self.validateKeys(token, ['regex', 'type'], 'token')
+      if not re.fullmatch('[A-Z][A-Z0-9_]*', token['type']):
+        raise Exception('Grammar: Invalid token type "{0}"'.format(token['type']))
+    
+    for token in self.config['tokens']:
+      try:
+        re.compile(token['regex'])
+      except re.error as e:
+        raise Exception('Grammar: Token "{0}" regex error, {1}'.format(token['type'], e))
+    
+    for keyword in self.config['keywords']:
+      for word in keyword['regex'].split('|'):
+        if not re.fullmatch('\\w+', word):
+          raise Exception('Grammar: Keyword "{0}" is not a plain word'.format(word))
+    
+    symKeys = ['name', 'typeName', 'array', 'const', 'port']
+    for typeDict in self.config['types']:
+      self.validateKeys(typeDict, ['name', 'paramSym'], 'type')
+      for symDict in typeDict['paramSym']:
+        self.validateKeys(symDict, symKeys + ['value'], 'type param')
+    
+    for methodDict in self.config['builtinMethod']:
+      self.validateKeys(methodDict, ['name', 'paramSym', 'returnTypeName', 'returnTypeDim', 'returnSym'], 'builtinMethod')
+      for symDict in methodDict['paramSym']:
+        self.validateKeys(symDict, symKeys + ['value'], 'builtinMethod param')
+      for symDict in methodDict['returnSym']:
+        self.validateKeys(symDict, symKeys, 'builtinMethod return')
+      
+      numReturn = len(methodDict['returnTypeName'])
+      if ((len(methodDict['returnTypeDim']) != numReturn) or (len(methodDict['returnSym']) != numReturn)):
+        raise Exception('Grammar: builtinMethod "{0}" return lists differ in length'.format(methodDict['name']))
+  
+  def validateKeys(self, entry, keys, entryName):
+    for key in keys:
+      if key not in entry:
+        raise Exception('Grammar: {0} entry {1} missing "{2}"'.format(entryName, dict(entry), key))
+  
+  def compile(self):
+    tokens   = self.config['tokens']
+    keywords = self.config['keywords']
+    
+    #Compile all token rules into one master regex. Alternatives are tried
+    #in order, so the priority declared in the config is kept. Pickled
+    #patterns only keep their source, unpickling compiles them again.
+    self.tokenTypes = tuple(token['type'] for token in tokens)
+    self.tokenRegex = re.compile('|'.join(
+      '(?P<T{0}>{1})'.format(ind, token['regex']) for ind, token in enumerate(tokens)))
+    
+    #Integer token kinds, shared by tokens and keywords
+    kindNames = ['EOL', 'EOF']
+    for tokenType in self.tokenTypes + tuple(keyword['type'] for keyword in keywords):
+      if tokenType not in kindNames:
+        kindNames.append(tokenType)
+    self.kindNames  = tuple(kindNames)
+    self.kindIds    = FrozenDict((name, ind) for ind, name in enumerate(self.kindNames))
+    self.tokenKinds = tuple(self.kindIds[tokenType] for tokenType in self.tokenTypes)
+    
+    #Keywords are plain word alternations, resolve them with a hash lookup
+    keywordTable = {}
+    for keyword in keywords:
+      for word in keyword['regex'].split('|'):
+        keywordTable.setdefault(word, self.kindIds[keyword['type']])
+    self.keywordTable = FrozenDict(keywordTable)
+    
+    #Assignment class tokens, recorded per line by the lexer
+    assignTypes = ['ASSIGN', 'CMPD_ARITH_ASSIGN', 'CMPD_LOGICAL_ASSIGN', 'POST_OPER']
+    self.assignKinds = frozenset(self.kindIds[x] for x in assignTypes if x in self.kindIds)
@@ -0,0 +1,106 @@
+from bisect import bisect_left
+
+from Lexer import IncrementalLexer
+from SyntaxParser import SyntaxParser, SimpleScope, ParseError
+
+#Reparse a file after line edits. Top level declarations start at base
+#scope, only the ones overlapping an edit are parsed again and spliced
+#into the FILE node. Untouched declaration nodes are kept as they are.
+class IncrementalParser(object):
+  def __init__(self, grammar, recover=False, keepComments=True):
+    self.lexer  = IncrementalLexer(grammar)
+    self.parser = SyntaxParser(self.lexer, recover=recover, keepComments=keepComments)
+    
+    self.fileNode  = None
+    self.baseScope = None
+    # First line of each node in fileNode.nodes
+    self.declLines = None
+  
+  def parse(self, file_str, fdl_filename, importName):
+    # Full parse, the result is the FILE node updated by edit
+    self.fileNode  = None
+    self.declLines = []
+    self.parser.diagnostics = []
+    self.fileNode  = self.parser.parseFile(file_str, fdl_filename, importName, self.declLines)
+    self.baseScope = self.parser.scope.scope[0]
+    return self.fileNode
+  
+  def edit(self, firstLine, lastLine, text):
+    # Replace lines firstLine up to (not including) lastLine with text,
+    # same as IncrementalLexer.edit. Returns the updated FILE node.
+    if (self.fileNode is None):
+      raise Exception('IncrementalParser: edit before parse')
+    
+    oldNumLines = len(self.lexer.lineStores)
+    (first, last) = self.lexer.edit(firstLine, lastLine, text)
+    lineShift = len(self.lexer.lineStores) - oldNumLines
+    lastOld = last - lineShift
+    
+    # Edit up to the first declaration changes the file comments
+    declLines = self.declLines
+    if ((not declLines) or (first <= declLines[0])):
+      return self.reparseAll()
+    
+    # Reparse from the declaration before the edit, a line added right
+    # before a declaration can still belong to the one above it
+    startInd = max(bisect_left(declLines, first) - 1, 0)
+    endInd   = bisect_left(declLines, lastOld)
+    endLine  = None
+    if (endInd < len(declLines)):
+      endLine = declLines[endInd] + lineShift
+    
+    parser = self.parser
+    parser.diagnostics = []
+    # New comments go to a scratch table, merged once the nodes are spliced
+    parser.commentTable = {}
+    parser.scope = SimpleScope(self.baseScope)
+    self.lexer.restart(declLines[startInd])
+    parser.next()
+    
+    nodes = []
+    lines = []
+    try:
+      parser.loadFileDecls(nodes, lines, endLine)
+      
+      # Later declarations are reused if parsing stopped right at the first one
+      if ((endLine is not None) and not ((parser.token.lineNo == endLine) and parser.atLineStart())):
+        parser.loadFileDecls(nodes, lines)
+        endInd = len(declLines)
+      
+      if parser.diagnostics:
+        raise ParseError(parser.diagnostics)
+    except ParseError:
+      # Tree no longer matches the text, next edit parses everything
+      self.declLines = []
+      raise
+    
+    # Replace comments of the old nodes with the ones of the new nodes
+    commentTable = self.fileNode.commentTable
+    for oldNode in self.fileNode.nodes[startInd:endInd]:
+      for node in oldNode.iterNodes():
+        commentTable.pop(node, None)
+    commentTable.update(parser.commentTable)
+    
+    self.fileNode.nodes[startInd:endInd] = nodes
+    self.declLines = declLines[0:startInd] + lines + [x + lineShift for x in declLines[endInd:]]
+    return self.fileNode
+  
+  def reparseAll(self):
+    # Parse the edited text again, keeping the FILE node identity
+    fileNode = self.fileNode
+    text = '\n'.join(store.source.text for store in self.lexer.lineStores)
+    try:
+      newNode = self.parse(text, fileNode.filename, fileNode.importName)
+    except ParseError:
+      self.fileNode  = fileNode
+      self.declLines = []
+      raise
+    
+    # File comments move from the new FILE node to the kept one
+    commentTable = newNode.commentTable
+    if newNode in commentTable:
+      commentTable[fileNode] = commentTable.pop(newNode)
+    fileNode.commentTable = commentTable
+    fileNode.nodes        = newNode.nodes
+    self.fileNode         = fileNode
+    return fileNode
@@ -1,15 +1,143 @@
 import re
+import sys
+from array import array
+from bisect import bisect_right
+from collections import deque
+from Grammar import Grammar
 
-#Token class for keeping track of type, value, and scope
-class Token(object):
-  def __init__(self, type, value, scope, textLine, lineNo, charNo):
-    self.type     = type
-    self.value    = value
-    self.scope    = scope
-    self.textLine = textLine
-    self.lineNo   = lineNo
-    self.charNo   = charNo
+#Source buffer shared by all tokens of a file. Tokens only keep an
+#absolute offset, line and column are computed when requested.
+class SourceText(object):
+  def __init__(self, text):
+    self.text       = text
+    self.lineStarts = None
+  
+  def getLineStarts(self):
+    # Build line start offsets on first use
+    if self.lineStarts is None:
+      self.lineStarts = [0]
+      pos = self.text.find('\n')
+      while (pos >= 0):
+        self.lineStarts.append(pos+1)
+        pos = self.text.find('\n', pos+1)
+    
+    return self.lineStarts
+  
+  def getLineCol(self, pos):
+    # Line number starts at 1, column at 0
+    lineStarts = self.getLineStarts()
+    lineInd = bisect_right(lineStarts, pos) - 1
+    return (lineInd+1, pos - lineStarts[lineInd])
+  
+  def getLine(self, lineNo):
+    # Account for +1 due to indexing
+    lineStarts = self.getLineStarts()
+    start = lineStarts[lineNo-1]
+    end = self.text.find('\n', start)
+    if (end < 0):
+      end = len(self.text)
+    return self.text[start:end]
+  
+  def __deepcopy__(self, memo):
+    # Buffer is never modified, share it between AST copies
+    return self
 
+#Single source line used by the incremental lexer. Token positions are
+#columns, lineNo is updated when lines are inserted or removed above.
+class SourceLine(object):
+  def __init__(self, text, lineNo):
+    self.text   = text
+    self.lineNo = lineNo
+  
+  def getLineCol(self, pos):
+    # Past the end of the line is the start of the next one, as for EOL
+    # tokens of the full lexer
+    if (pos > len(self.text)):
+      return (self.lineNo+1, 0)
+    return (self.lineNo, pos)
+  
+  def getLine(self, lineNo):
+    return self.text
+  
+  def __deepcopy__(self, memo):
+    # Line is only renumbered, share it between AST copies
+    return self
+
+#Struct-of-arrays store for all tokens lexed from one source. Kinds are
+#small integers into kindNames and values are interned strings.
+class TokenStore(object):
+  def __init__(self, source, kindNames):
+    self.source    = source
+    self.kindNames = kindNames
+    self.kinds     = array('H')
+    self.scopes    = array('H')
+    self.positions = array('I')
+    self.values    = []
+    
+    #Line facts, recorded while scanning. lines holds the line of each
+    #token, lineEols the index of each line's EOL/EOF token and lineAsgns
+    #the index of each line's last assignment token (-1 if none).
+    self.lines     = array('I')
+    self.lineEols  = array('I')
+    self.lineAsgns = array('i')
+    self.lineAsgn  = -1
+  
+  def add(self, kind, value, scope, pos):
+    # Append token and return a view of it
+    self.kinds.append(kind)
+    self.scopes.append(scope)
+    self.positions.append(pos)
+    self.values.append(value)
+    self.lines.append(len(self.lineEols))
+    return Token(self, len(self.values)-1)
+  
+  def endLine(self):
+    # Last token added ends the line, record its facts
+    self.lineEols.append(len(self.values)-1)
+    self.lineAsgns.append(self.lineAsgn)
+    self.lineAsgn = -1
+  
+  def __deepcopy__(self, memo):
+    # Store is never modified after lexing, share it between AST copies
+    return self
+
+#Token class for keeping track of type, value, and scope. A token is
+#only a view of its entry in the TokenStore.
+class Token(object):
+  __slots__ = ('store', 'ind')
+  
+  def __init__(self, store, ind):
+    self.store = store
+    self.ind   = ind
+  
+  @property
+  def kind(self):
+    return self.store.kinds[self.ind]
+  
+  @property
+  def type(self):
+    return self.store.kindNames[self.store.kinds[self.ind]]
+  
+  @property
+  def value(self):
+    return self.store.values[self.ind]
+  
+  @property
+  def scope(self):
+    return self.store.scopes[self.ind]
+  
+  @property
+  def pos(self):
+    return self.store.positions[self.ind]
+  
+  @property
+  def lineNo(self):
+    return self.store.source.getLineCol(self.pos)[0]
+  
+  @property
+  def charNo(self):
+    return self.store.source.getLineCol(self.pos)[1]
+  
   def __str__(self):
     return 'Token(type="{type}", value="{val}", scope="{scope}", [lineNo,charNo],=[{line},{char}])'.format(
       type   = self.type,
@@ -18,149 +146,376 @@ class Token(object):
       line   = self.lineNo,
       char   = self.charNo
     )
-    
+  
   def __repr__(self):
     return self.__str__()
-    
-    
+
+
 class Lexer(object):
   def __init__(self, config):
+    #Compiled grammar tables are shared by all lexers, build them only
+    #when given a raw YAML config
+    if not isinstance(config, Grammar):
+      config = Grammar(config)
+    self.grammar = config
+    
     #Get token and keyword list from config
     self.tokens   = config['tokens']
     self.keywords = config['keywords']
     
-    self.textTokens = []
-      
+    #Master token regex and integer token kinds from compiled grammar
+    self.tokenTypes   = config.tokenTypes
+    self.tokenRegex   = config.tokenRegex
+    self.kindNames    = config.kindNames
+    self.kindIds      = config.kindIds
+    self.tokenKinds   = config.tokenKinds
+    self.keywordTable = config.keywordTable
+    self.assignKinds  = config.assignKinds
+    self.wsRegex      = re.compile('\\s+')
+    self.errRegex     = re.compile('\\S*')
+    
+    #Strings, comments and bit literals use dedicated linear scanners,
+    #selected by their first character
+    self.scanners = {
+      '#':  self.scanComment,
+      '"':  self.scanString,
+      'x':  self.scanBitLiteral,
+      'b':  self.scanBitLiteral,
+      "'":  self.scanBitLiteral,
+    }
+    self.hexDigits = '0123456789abcdefABCDEF'
+    self.binDigits = '01ZXLH_-'
+    
+    #Lookahead window of tokens lexed but not yet consumed
+    self.textTokens = deque()
+  
+  def newContext(self):
+    # Lexer with its own text state, sharing the compiled grammar
+    return type(self)(self.grammar)
+  
+  def formatText(self, text):
+    # Tabs count as two spaces of scope, carriage returns are dropped
+    return text.replace('\t','  ').replace('\r','')
+  
   def convert(self, text):
     
-    #Format text
-    self.text     = text.replace('\t','  ')
-    self.text     = self.text.replace('\r','')
-    self.text     = self.text.split('\n')
+    #Format text, whole file is kept as one buffer
+    self.text     = self.formatText(text)
+    self.source   = SourceText(self.text)
+    self.store    = TokenStore(self.source, self.kindNames)
     
-    # Initialize
-    self.lineInd  = 0
-    self.charInd  = 0
-    self.numLines = len(self.text)
+    # Initialize, all positions are absolute offsets into text.
+    # Matches are bounded by lineEnd so no rule can cross a line.
+    self.pos      = 0
+    self.setLine(0)
     self.complete = False
     self.scope    = 0
     
-    #Parse entire file into tokens
+    #Tokens are lexed on demand by get/peek
     self.textTokens.clear()
-    while (not self.complete):
+  
+  def fill(self, numTokens):
+    #Lex tokens until lookahead window has numTokens or EOF is reached
+    while ((len(self.textTokens) < numTokens) and not self.complete):
       self.textTokens.append(self.get_next_token())
-      #print(self.textTokens[-1])
-    
-      
+  
   def getTextLine(self, lineNo):
-    # Account for +1 due to indexing
-    return self.text[lineNo-1]
-      
+    return self.source.getLine(lineNo)
+  
   def get(self):
-    #Return token and remove from list
-    return self.textTokens.pop(0)
+    #Return token and remove from window
+    self.fill(1)
+    return self.textTokens.popleft()
+  
+  def getLineFacts(self, token):
+    # Facts of the line holding token, lexing ahead until the line ends.
+    # Returns (index of EOL token, index of last assignment token or -1),
+    # indices are into token.store.
+    store = token.store
+    line  = store.lines[token.ind]
+    while ((len(store.lineEols) <= line) and not self.complete):
+      self.textTokens.append(self.get_next_token())
     
+    return (store.lineEols[line], store.lineAsgns[line])
+  
   def peek(self,ind=1):
     #Return token at ind, but dont remove
+    self.fill(ind+1)
     return self.textTokens[ind]
+  
+  def setLine(self, lineStart):
+    # Find bounds of line starting at lineStart
+    self.lineStart = lineStart
+    self.lineEnd   = self.text.find('\n', lineStart)
+    if (self.lineEnd < 0):
+      self.lineEnd = len(self.text)
+  
+  def advanceLine(self):
+    # Move to start of next line
+    if (self.lineEnd == len(self.text)):
+      #Entire text has been parsed
+      self.pos = self.lineEnd
+      self.complete = True
+      return self.addLineEnd(self.kindIds['EOF'])
     
-  def advanceIndex(self, matchStr):
-    matchLen = len(matchStr)
-    currLineLen = len(self.text[self.lineInd])
-    
-    # Increment charInd and lineInd if necessary
-    if ((self.charInd + matchLen) < currLineLen):
-      self.charInd += matchLen
-    else:
-      self.lineInd += 1
-      self.charInd = 0
-      
-      #Check if entire text has been parsed
-      if len(self.text) == self.lineInd:
-        self.complete = True
-        return 'EOF'
-      else:
-        return 'EOL'
-        
-    return None
-        
+    self.pos = self.lineEnd + 1
+    self.setLine(self.pos)
+    return self.addLineEnd(self.kindIds['EOL'])
+  
+  def addLineEnd(self, kind):
+    # Add EOL/EOF token, closing the line facts
+    token = self.store.add(kind, None, self.scope, self.pos)
+    self.store.endLine()
+    return token
+  
   def matchWhiteSpace(self):
-    #Get Str
-    lineStr = self.text[self.lineInd][self.charInd:]
+    #if rest of line is empty, report EOL
+    if (self.pos == self.lineEnd):
+      return self.advanceLine()
     
     #Find whitespace first
-    matchObj = re.match('\s+',lineStr)
-    
-    #if lineStr is empty, report EOL
-    if not lineStr:
-      ws = self.advanceIndex(lineStr)
-      return Token(ws, None, self.scope, lineStr, self.lineInd+1, self.charInd)
+    matchObj = self.wsRegex.match(self.text, self.pos, self.lineEnd)
     
     #if WS was found, advance and check EOL EOF
-    elif (matchObj):
-      matchStr = matchObj.group(0)
-      #Check scope if charInd == 0
-      if self.charInd == 0:
+    if (matchObj):
+      #Check scope if at start of line
+      if (self.pos == self.lineStart):
         #Determine scope from spaces
-        self.scope = len(matchStr)
+        self.scope = matchObj.end() - self.pos
       
       #Return token if 'EOL' or 'EOF'
-      ws = self.advanceIndex(matchStr)
-      if ws is not None:
-        return Token(ws, None, self.scope, lineStr, self.lineInd+1, self.charInd)
-        
+      self.pos = matchObj.end()
+      if (self.pos == self.lineEnd):
+        return self.advanceLine()
+    
     # No WS but not EOL, EOF. Can only be scope = 0
-    if self.charInd == 0:
+    if (self.pos == self.lineStart):
       #Scope is 0
       self.scope = 0
     
     #Removed whitespace, but not EOL or EOF token
     return None
-
-      
+  
+  
   def matchKeywords(self, matchStr):
-    #Check IDs if they are keywords
-    for keyword in self.keywords:
-      regexPattern = '\\b('+ keyword['regex'] + ')\\b'
-      matchObj = re.match(regexPattern, matchStr)
-      if matchObj:
-        return keyword['type']
-    
-    # No match found, must be ID
+    #Check IDs if they are keywords. A trailing '@' or '!' is not part
+    #of the word, same as the old '\\b' word boundary match.
+    return self.keywordTable.get(matchStr.rstrip('@!'))
+  
+  def scanComment(self):
+    # Comments run to the end of the line
+    if self.text.startswith('#!', self.pos, self.lineEnd):
+      tokenType = 'COMMENT_HEADER'
+    elif self.text.startswith('##', self.pos, self.lineEnd):
+      tokenType = 'COMMENT_FMT'
+    else:
+      tokenType = 'COMMENT'
+    
+    return (self.kindIds[tokenType], self.lineEnd)
+  
+  def scanString(self):
+    # String ends at the first quote not escaped by a backslash
+    quoteInd = self.text.find('"', self.pos+1, self.lineEnd)
+    while (quoteInd >= 0):
+      # Count backslashes in front of quote
+      numEsc = 0
+      while (self.text[quoteInd-1-numEsc] == '\\'):
+        numEsc += 1
+      
+      if (numEsc % 2 == 0):
+        return (self.kindIds['STRING'], quoteInd+1)
+      
+      quoteInd = self.text.find('"', quoteInd+1, self.lineEnd)
+    
+    # Not terminated on this line
     return None
+  
+  def scanBitLiteral(self):
+    # BIT_INIT_HEX x'..', BIT_INIT_BIN b'..' or '..'
+    start = self.pos
+    if (self.text[start] == 'x'):
+      tokenType = 'BIT_INIT_HEX'
+      digits = self.hexDigits
+      start += 1
+    else:
+      tokenType = 'BIT_INIT_BIN'
+      digits = self.binDigits
+      if (self.text[start] == 'b'):
+        start += 1
+    
+    # Not a bit literal, let token rules handle it (IDs starting with x or b)
+    if ((start >= self.lineEnd) or (self.text[start] != "'")):
+      return None
+    
+    # Must be closed on this line with at least one valid digit
+    end = self.text.find("'", start+1, self.lineEnd)
+    if ((end < 0) or (end == start+1)):
+      return None
     
+    if self.text[start+1:end].strip(digits):
+      return None
+    
+    return (self.kindIds[tokenType], end+1)
+  
   def get_next_token(self):
     #Return EOF if lexer reached end of text
     if self.complete:
-      return Token('EOF', None, self.scope, '', self.lineInd+1, self.charInd)
+      return self.addLineEnd(self.kindIds['EOF'])
     
     wsToken = self.matchWhiteSpace()
     if wsToken:
       return wsToken
-      
-    #Get String
-    lineStr = self.text[self.lineInd][self.charInd:]
-      
-    #Match tokens from config
-    for token in self.tokens:
-      regexPattern = '('+ token['regex'] + ')'
-      matchObj = re.match(regexPattern, lineStr)
-      if matchObj:
-        # match string
-        matchStr = matchObj.group(0)
-        
-        # for token 'ID', match against keywords
-        if (token['type'] == 'ID'):
-          keyword = self.matchKeywords(matchStr)
-          if keyword:
-            token = Token(keyword, matchStr, self.scope, lineStr, self.lineInd+1, self.charInd)
-          else:
-            token = Token(token['type'], matchStr, self.scope, lineStr, self.lineInd+1, self.charInd)
-        else:
-          token = Token(token['type'], matchStr, self.scope, lineStr, self.lineInd+1, self.charInd)
-        self.charInd += len(matchStr)
+    
+    #Use dedicated scanner if one exists for this character
+    scanner = self.scanners.get(self.text[self.pos])
+    if scanner is not None:
+      scanned = scanner()
+      if scanned is not None:
+        tokenKind, end = scanned
+        token = self.store.add(tokenKind, sys.intern(self.text[self.pos:end]), self.scope, self.pos)
+        self.pos = end
         return token
     
+    #Match tokens from config, all rules in a single pass
+    matchObj = self.tokenRegex.match(self.text, self.pos, self.lineEnd)
+    if matchObj:
+      # match string
+      matchStr = matchObj.group(0)
+      tokenKind = self.tokenKinds[int(matchObj.lastgroup[1:])]
+      
+      # for token 'ID', match against keywords
+      if (tokenKind == self.kindIds['ID']):
+        keyword = self.matchKeywords(matchStr)
+        if keyword is not None:
+          tokenKind = keyword
+      token = self.store.add(tokenKind, sys.intern(matchStr), self.scope, self.pos)
+      if (tokenKind in self.assignKinds):
+        self.store.lineAsgn = token.ind
+      self.pos = matchObj.end()
+      return token
+    
     #Token not found, exception
-    raise Exception('Invalid character "{0}", lineNo="{1}"'.format(re.match('(\S*)', lineStr).group(0), self.lineInd+1))
+    errStr = self.errRegex.match(self.text, self.pos, self.lineEnd).group(0)
+    raise Exception('Invalid character "{0}", lineNo="{1}"'.format(errStr, self.source.getLineCol(self.pos)[0]))
+
+
+#Lexer for editor tooling. Tokens are kept per line, so an edit only
+#re-lexes the changed lines plus the lines whose scope it changes.
+#Unchanged lines keep their TokenStore, and the tokens in it.
+class IncrementalLexer(Lexer):
+  def __init__(self, config):
+    Lexer.__init__(self, config)
+    self.lineStores = []
+    self.tokenIter  = iter([])
+  
+  def convert(self, text):
+    # Lex entire text line by line
+    lines = self.formatText(text).split('\n')
+    self.lineStores = self.lexLines(lines, 1, 0, True)
+    self.restart()
+  
+  def lexLine(self, text, lineNo, scope, isLast):
+    # Lex a single line with the scope carried over from the line above
+    self.text     = text
+    self.source   = SourceLine(text, lineNo)
+    self.store    = TokenStore(self.source, self.kindNames)
+    self.pos      = 0
+    self.setLine(0)
+    self.complete = False
+    self.scope    = scope
+    while (not self.complete):
+      self.get_next_token()
+    
+    # A one line buffer ends with EOF, only the last line of the text keeps it.
+    # EOL is placed after the newline, same as the full lexer.
+    if not isLast:
+      self.store.kinds[-1] = self.kindIds['EOL']
+      self.store.positions[-1] = len(text)+1
+    
+    return self.store
+  
+  def lexLines(self, lines, lineNo, scope, endsText):
+    # Lex consecutive lines, returns their stores
+    stores = []
+    for ind, line in enumerate(lines):
+      isLast = endsText and (ind == len(lines)-1)
+      stores.append(self.lexLine(line, lineNo+ind, scope, isLast))
+      scope = stores[-1].scopes[-1]
     
+    return stores
+  
+  def getExitScope(self, lineInd):
+    # Scope carried into the line after lineInd (0 before the first line)
+    if (lineInd < 0):
+      return 0
+    return self.lineStores[lineInd].scopes[-1]
+  
+  def edit(self, firstLine, lastLine, text):
+    # Replace lines firstLine up to (not including) lastLine with text.
+    # Text that does not end in a newline is joined with lastLine.
+    # Returns (first, last) line numbers, last exclusive, whose tokens changed.
+    firstInd = firstLine - 1
+    lastInd  = lastLine - 1
+    if ((firstInd < 0) or (lastInd < firstInd) or (lastInd > len(self.lineStores))):
+      raise Exception('Invalid edit range [{0},{1})'.format(firstLine, lastLine))
+    
+    text = self.formatText(text)
+    if (lastInd == len(self.lineStores)):
+      # Replaced up to end of text
+      newLines = text.split('\n')
+    elif text.endswith('\n'):
+      newLines = text.split('\n')[0:-1]
+    else:
+      newLines = (text + self.lineStores[lastInd].source.text).split('\n')
+      lastInd += 1
+    
+    # Lex new lines, nothing is changed until lexing succeeds
+    endsText = (lastInd == len(self.lineStores))
+    oldExitScope = self.getExitScope(lastInd-1)
+    newStores = self.lexLines(newLines, firstLine, self.getExitScope(firstInd-1), endsText)
+    
+    # Ripple scope into following lines until it matches the old scope
+    scope = newStores[-1].scopes[-1] if newStores else self.getExitScope(firstInd-1)
+    while ((scope != oldExitScope) and (lastInd < len(self.lineStores))):
+      oldExitScope = self.getExitScope(lastInd)
+      oldStore = self.lineStores[lastInd]
+      isLast = (lastInd == len(self.lineStores)-1)
+      newStores.append(self.lexLine(oldStore.source.text, 0, scope, isLast))
+      scope = newStores[-1].scopes[-1]
+      lastInd += 1
+    
+    # Splice in new lines, lines after them only move if line count changed
+    lineShift = len(newStores) - (lastInd - firstInd)
+    self.lineStores[firstInd:lastInd] = newStores
+    endInd = len(self.lineStores) if lineShift else firstInd+len(newStores)
+    for ind in range(firstInd, endInd):
+      self.lineStores[ind].source.lineNo = ind+1
+    
+    self.restart()
+    return (firstInd+1, firstInd+1+len(newStores))
+  
+  def getTextLine(self, lineNo):
+    return self.lineStores[lineNo-1].source.text
+  
+  def getLineTokens(self, lineNo):
+    # All tokens of a line, ending in EOL or EOF
+    store = self.lineStores[lineNo-1]
+    return [Token(store, ind) for ind in range(len(store.values))]
+  
+  def iterTokens(self, lineNo):
+    for store in self.lineStores[lineNo-1:]:
+      for ind in range(len(store.values)):
+        yield Token(store, ind)
+  
+  def restart(self, lineNo=1):
+    # Stream tokens to get/peek starting at lineNo
+    self.textTokens.clear()
+    self.tokenIter = self.iterTokens(lineNo)
+  
+  def fill(self, numTokens):
+    #Take tokens from line stores until lookahead window has numTokens
+    while (len(self.textTokens) < numTokens):
+      token = next(self.tokenIter, None)
+      if token is None:
+        break
+      self.textTokens.append(token)
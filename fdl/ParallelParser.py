@@ -0,0 +1,80 @@
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+from Lexer import Lexer
+from SyntaxParser import SyntaxParser
+
+# Parser of each worker process, built once by initWorker
+workerParser = None
+
+def initWorker(grammar, cacheDir, recover):
+  global workerParser
+  workerParser = SyntaxParser(Lexer(grammar), cacheDir, recover)
+
+def parseWorker(fdl_filename):
+  # Parse one file, tree is returned pickled so every use can unpickle its own copy
+  fo = open(fdl_filename)
+  fdlStr = fo.read()
+  fo.close()
+  
+  ast = workerParser.parse(fdlStr, fdl_filename, None)
+  return pickle.dumps(ast, pickle.HIGHEST_PROTOCOL)
+
+#Parse files on a process pool. Imports are scheduled as soon as the
+#semantic analyzer resolves them, ASTs come back in the same order as
+#parsing the files one at a time.
+class ParallelParser(object):
+  def __init__(self, grammar, cacheDir=None, numWorkers=None, recover=False):
+    self.grammar    = grammar
+    self.cacheDir   = cacheDir
+    self.numWorkers = numWorkers or os.cpu_count() or 1
+    self.recover    = recover
+  
+  def parse(self, fdl_filename_list, semAnalyzer):
+    # fdl_filename_list holds (filename, importName), imports found by
+    # semAnalyzer.pre_process are appended to it
+    if (self.numWorkers == 1):
+      return self.parseSerial(fdl_filename_list, semAnalyzer)
+      
+    astList = []
+    with ProcessPoolExecutor(self.numWorkers, initializer=initWorker, initargs=(self.grammar, self.cacheDir, self.recover)) as pool:
+      # Each file is parsed once, even if imported several times
+      futures = {}
+      for (fdl_filename, importName) in fdl_filename_list:
+        if fdl_filename not in futures:
+          futures[fdl_filename] = pool.submit(parseWorker, fdl_filename)
+      
+      # Results are consumed in list order, so pre_process sees files in
+      # the same order as a sequential parse
+      for (fdl_filename, importName) in fdl_filename_list:
+        ast = pickle.loads(futures[fdl_filename].result())
+        ast.importName = importName
+        astList.append(ast)
+        
+        # Check semantics, schedule new imports right away
+        addedFiles = semAnalyzer.pre_process(ast)
+        for (addedFilename, addedImport) in addedFiles:
+          if addedFilename not in futures:
+            futures[addedFilename] = pool.submit(parseWorker, addedFilename)
+        fdl_filename_list.extend(addedFiles)
+    
+    return astList
+    
+  def parseSerial(self, fdl_filename_list, semAnalyzer):
+    # Single worker, parse in this process without pickling trees
+    parser = SyntaxParser(Lexer(self.grammar), self.cacheDir, self.recover)
+    astList = []
+    for (fdl_filename, importName) in fdl_filename_list:
+      fo = open(fdl_filename)
+      fdlStr = fo.read()
+      fo.close()
+      
+      ast = parser.parse(fdlStr, fdl_filename, importName)
+      astList.append(ast)
+      
+      # Check semantics
+      addedFiles = semAnalyzer.pre_process(ast)
+      fdl_filename_list.extend(addedFiles)
+      
+    return astList
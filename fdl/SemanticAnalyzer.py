@@ -1,8 +1,9 @@
 from collections import OrderedDict
-from copy import deepcopy,copy
+from copy import copy
 from NodeVisitor import NodeVisitor
 from SymbolTable import SymbolTable
 from Symbols import *
+from SymbolCheckers import signature
 #from Symbol
 
 import os.path
@@ -28,6 +29,9 @@ class SemanticAnalyzer (NodeVisitor):
     # Collection of all ASTs
     self.astList = []
     
+    # (signal, calling scope) of a method call, set while visiting it
+    self.methodCall = None
+    
   def __builtin__(self, config):
     # Loop over type functions
     self.builtinMethod = config['builtinMethod']
@@ -61,7 +65,7 @@ class SemanticAnalyzer (NodeVisitor):
     
     if (replaceEnclosingScope):
       self.oldEnclosingScope = newScope.enclosingScope
-      newScope.enclosingScope = self.scope
+      newScope.setEnclosingScope(self.scope)
     
     # Move to new symbol table scope
     self.scope = newScope
@@ -72,7 +76,7 @@ class SemanticAnalyzer (NodeVisitor):
     
     if (self.replaceEnclosingScope):
       desiredScope = self.scope.enclosingScope
-      self.scope.enclosingScope = self.oldEnclosingScope
+      self.scope.setEnclosingScope(self.oldEnclosingScope)
       self.scope = desiredScope
     else:
       self.scope = self.scope.enclosingScope
@@ -330,7 +334,8 @@ class SemanticAnalyzer (NodeVisitor):
         # Normal check, verify data type
         typeSym = self.lookupName(param.type)
       
-      # Replace type name
+      # Replace type name on a copy, tree stays as parsed
+      param = copy(param)
       param.type = typeSym.name
       
       # Create param symbol
@@ -440,11 +445,11 @@ class SemanticAnalyzer (NodeVisitor):
     params = typeSym.verifyInputs(paramSymList)
        
     # Replace array indicies with values
-    self.checkArray(node)
+    array = self.checkArray(node)
     
     # Type, array size, and init value verified
     varDecl = SignalSymbol(node, typeSym, params)
-    varDecl.setArray(node.array)
+    varDecl.setArray(array)
     
     # Validate Init value
     if (node.value != None):
@@ -539,10 +544,7 @@ class SemanticAnalyzer (NodeVisitor):
     if (left.const and right.const):
       resultStr = eval(resultStr)
     
-    result = deepcopy(left)
-    result.value = [resultStr]
-    result.array = array
-    return result
+    return ExprResult(left, [resultStr], array)
     
   def visit_term(self,node):
     # First visit node to verify it
@@ -567,6 +569,26 @@ class SemanticAnalyzer (NodeVisitor):
     sigSym.assignConstValue(node.value)
     return sigSym
     
+  def visit_const_array(self, node):
+    # Verify type exists
+    typeSym = self.lookupName(node.typeName)
+    
+    # Constant aggregate, one signal indexed [0:len-1] holding all values
+    sigSym = SignalSymbol(node, typeSym, node.params)
+    sigSym.setArray([[0, len(node.value)-1]])
+    sigSym.assignArrayValue(node.value)
+    return sigSym
+    
+  def visit_bits(self, node):
+    # Verify type exists
+    typeSym = self.lookupName(node.typeName)
+    
+    # Bit-vector literal, one signal indexed [width-1:0]
+    sigSym = SignalSymbol(node, typeSym, node.params)
+    sigSym.setArray([[node.width-1, 0]])
+    sigSym.assignBitsValue(node)
+    return sigSym
+    
   def visit_var(self, node):
     # Replace array indicies with values
     #self.checkArray(node)
@@ -588,6 +610,7 @@ class SemanticAnalyzer (NodeVisitor):
     
     # Check if method was used
     if (node.method is not None):
+      self.methodCall = (declNode, oldScope)
       declNode = self.visit(node.method)
       
     self.nextScope(oldScope)
@@ -595,29 +618,63 @@ class SemanticAnalyzer (NodeVisitor):
     return declNode
     
   def visit_funccall(self, node):
-    # Load function symbol
+    # Signal of a method call, before inputs can call other methods
+    (owner, callScope) = self.methodCall if node.method else (None, self.scope)
+    self.methodCall = None
+    
+    # Verify input parameters, in the scope of the caller
+    funcScope = self.scope
+    inputSyms = []
+    for param in node.params:
+      self.scope = callScope
+      inputSym = self.visit(param)
+      self.scope = funcScope
+      
+      if type(inputSym) is list:
+        # functions could return multiple values, which is not allowed
+        if (len(inputSym) != 1):
+          raise Exception('Parameter function returned multiple values, not allowed')
+        
+        inputSym = inputSym[0]
+        
+      inputSyms.append(inputSym)
+      
+    # Load function symbol overloaded for input types and dimensions.
+    # Methods try a self param first, builtin methods have none.
+    inputSig = signature(inputSyms)
     if node.method:
-      funcSym = self.scope.lookup(node.name, 'function', recursive=False)
+      callSigs = [signature(inputSyms, owner), inputSig]
     else: 
-      funcSym = self.scope.lookup(node.name, 'function')
+      callSigs = [inputSig]
+    
+    funcSym = None
+    for sig in callSigs:
+      funcSym = self.scope.lookupOverload(node.name, sig, recursive=not node.method)
+      if funcSym is not None:
+        break
+        
+    if funcSym is None:
+      overloads = self.scope.listOverloads(node.name, recursive=not node.method)
+      raise Exception('Function "{0}" has no overload for inputs {1}, overloads are {2}'.format(node.name.value, callSigs, overloads))
       
     # TODO check generics
     
     # Check parameters
-    funcSym.verifyInputs(node.params)
+    funcSym.verifyInputs(inputSyms)
     
     return funcSym.returnNodes
     
       
   def checkArray(self, node):
+    # Returns array with indicies replaced by values, node is not modified
     if (node.array == None):
-      return
+      return None
       
     # If var is a declaration, array values must be const
     isDecl = node.decl
     
     # Check array sizes use constants
-    arrayVal = node.array
+    arrayVal = [list(arg) for arg in node.array]
     for i,arg in enumerate(node.array):
       for j,val in enumerate(arg):
         
@@ -641,6 +698,8 @@ class SemanticAnalyzer (NodeVisitor):
         else:
           raise Exception('ArrayInd bad')
           
+    return arrayVal
+    
   def lookupName(self, node):
     # This scope
     oldScope = self.scope
@@ -671,40 +730,7 @@ class SemanticAnalyzer (NodeVisitor):
     return sym
     
   def createOverloadedSymbols(self, funcSym):
-    # Get input parameters, and create overloaded function names
-    params = funcSym.returnParams()
-    names = self.calcAllFuncNames(funcSym.name, params)
-    
-    # Add names to scope
-    for name in names:
-      funcSymCopy = copy(funcSym)
-      funcSymCopy.name = name
-      self.scope.insert(funcSymCopy)
-    
-  def calcAllFuncNames(self,funcName, inputs):
-    # Determine all function names for function
-    
-    # Calculate name with no inputs
-    defaultInd = np.array([x.value == None for x in inputs])
-    if (len(inputs) == 0):
-      defaultParam = inputs
-    else:
-      defaultParam = list(np.array(inputs)[defaultInd])
-      
-    names = [self.calcOverloadFuncName(funcName, defaultParam)]
-    print(names)
-    
-    for ind in range(0,len(inputs)):
-      if (inputs[ind].value != None):
-        name = self.calcOverloadFuncName(funcName, inputs[0:ind+1])
-        names.append(name)
-        print(names)
-      
-    return names
-    
-  def calcOverloadFuncName(self,funcName, inputs):
-    # Determine function name with one that can be resolved
-    for x in inputs:
-      funcName += '_{0}{1}'.format(x.typeName, x.typeDim)
-      
-    return funcName
+    # Add function once for every signature it can be called with,
+    # calls resolve it by the types and dimensions of their inputs
+    for sig in funcSym.overloadSignatures():
+      self.scope.insert(funcSym, signature=sig)
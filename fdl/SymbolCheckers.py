@@ -1,4 +1,38 @@
-from copy import deepcopy
+from collections import OrderedDict
+
+import numpy as np
+
+from Lexer import Token
+
+def freezeValue(value):
+  # Read-only form of a symbol value, shared instead of deep copied.
+  # Arrays get a read-only shallow copy, lists become tuples. Symbols
+  # keep the result until their value changes, see getFrozenValue.
+  if isinstance(value, np.ndarray):
+    if value.flags.writeable:
+      value = value.copy()
+      value.setflags(write=False)
+    return value
+  elif isinstance(value, list):
+    return tuple(freezeValue(x) for x in value)
+  else:
+    return value
+
+def typeKey(typeName):
+  # Plain name of a type given as str, Token or list of name parts
+  if isinstance(typeName, (list, tuple)):
+    typeName = typeName[-1]
+  if isinstance(typeName, Token):
+    typeName = typeName.value
+  return typeName
+
+def signature(symbols, owner=None):
+  # Overload key of a list of input symbols, type and dimension of each.
+  # Methods start with the dimension of the object they are called on.
+  sig = tuple((typeKey(sym.typeName), sym.typeDim) for sym in symbols)
+  if (owner is not None):
+    sig = (('self', owner.typeDim),) + sig
+  return sig
 
 class TypeTraitChecker(object):
   def __init__(self):
@@ -84,10 +118,33 @@ class ParamChecker (object):
     # Param verification
     params = self.returnParams()
     self.required = [x.value == None for x in params]
-    self.numArgs  = len(self.required)
+    self.numArgs  = len(self.callParams())
     
     self.verifyDefaultValues()
     
+  def callParams(self):
+    # Params given at a call, methods get self from the object they are
+    # called on
+    params = self.returnParams()
+    if (len(params) > 0) and (typeKey(params[0].name) == 'self'):
+      return params[1:]
+    return params
+    
+  def overloadSignatures(self):
+    # Signatures this symbol can be called with, the required params
+    # alone and every prefix ending in a param with default value
+    params = self.callParams()
+    owner = None
+    if (len(params) < len(self.returnParams())):
+      owner = self.returnParams()[0]
+      
+    sigs = [signature([x for x in params if x.value is None], owner)]
+    for ind in range(len(params)):
+      if (params[ind].value is not None):
+        sigs.append(signature(params[0:ind+1], owner))
+        
+    return list(OrderedDict.fromkeys(sigs))
+    
   def verifyDefaultValues(self):
     # Default values can only be defined after previous values havent.
     # After default values defined, next params must have default values.
@@ -110,12 +167,12 @@ class ParamChecker (object):
       raise('"{0}" has {1} params but {2} given.'.format(self.name, self.numArgs, lenArgs))
     
     # Loop over input params
-    params = self.returnParams()
+    params = self.callParams()
     
     inputValues = []
     for ind,node in enumerate(inputNodes):
       # Check params match
-      if (node.typeName not in params[ind].typeName):
+      if (typeKey(node.typeName) != typeKey(params[ind].typeName)):
         raise Exception('{0}: {1} type does not match {2}.'.format(params[ind].name, node.typeName, params[ind].typeName))
         
       # Check dimensions
@@ -125,9 +182,9 @@ class ParamChecker (object):
       # Check if value is defined
       if (node.value is not None):
         # Param defined, takes priority over default value
-        value = deepcopy(node.value)
+        value = node.getFrozenValue()
       elif (params[ind].value is not None):
-        value = deepcopy(params[ind].value)
+        value = params[ind].getFrozenValue()
       else:
         raise Exception('{0} does not have default value.'.format(params[ind].name))
         
@@ -136,7 +193,7 @@ class ParamChecker (object):
       
     # Loop over parameters not defined, if they exist
     for ind in range(lenArgs,self.numArgs):
-      inputValues.append((params[ind].name, deepcopy(params[ind].value)))
+      inputValues.append((params[ind].name, params[ind].getFrozenValue()))
           
     return inputValues
     
@@ -172,4 +229,4 @@ class ReturnStmtChecker(object):
         raise Exception('{0}: Dimension does not match {1} =/= {2}.'.format(node.name, node.typeDim, self.returnTypeDim[ind]))
         
       # Append input
-      self.returnNodes.append((returnNodes[ind].name, deepcopy(node.value)))
+      self.returnNodes.append((returnNodes[ind].name, node.getFrozenValue()))
@@ -2,16 +2,39 @@ from collections import OrderedDict
 
 from Lexer import Token
 
+#Insert counters shared by all scopes of one tree. Cached lookups of a
+#name stay valid until a symbol of that name is inserted or removed, or
+#an enclosing scope is replaced.
+class ScopeGenerations (object):
+  def __init__(self):
+    self.names = {}
+    self.chain = 0
+    
+  def get(self, name):
+    return (self.names.get(name, 0), self.chain)
+    
+  def bump(self, name):
+    self.names[name] = self.names.get(name, 0) + 1
+
 class SymbolTable (object):
   def __init__(self,scopeName,scopeLevel,enclosingScope):
-    # Initialize symbol table, it is list inside a dict.
-    # The outer dict checks for symbol name, and inner list
-    # has what that symbol means. 
+    # Initialize symbol table, it is a dict of buckets. The outer dict
+    # checks for symbol name, the bucket maps each symbol type to the
+    # symbol, so a signal and a function can share a name.
     self._symbol        = OrderedDict()
+    # Overloaded symbols, name -> signature -> symbol
+    self._overloads     = OrderedDict()
     self.scopeName      = scopeName
     self.scopeLevel     = scopeLevel
     self.enclosingScope = enclosingScope
     
+    # Lookup results by (name, type, recursive), with generation when found
+    self._lookupCache   = {}
+    if enclosingScope is None:
+      self._generations = ScopeGenerations()
+    else:
+      self._generations = enclosingScope._generations
+    
     # Being inside implementation allows to replace Self with actual value
     if enclosingScope is None:
       self.impl        = False
@@ -40,21 +63,34 @@ class SymbolTable (object):
     
   def setModule(self, value):
     self.module = value
+    
+  # Used to scope implementations, drops all cached lookups
+  def setEnclosingScope(self, scope):
+    self.enclosingScope = scope
+    self._generations.chain += 1
        
-  def insert(self, symbol, lookupCheck=True):
+  def insert(self, symbol, lookupCheck=True, signature=None):
     # Inserts symbol into table, and checks for replicas
-    # Returns bool if it was inserted
+    # Returns bool if it was inserted. Symbols with a signature are
+    # overloads, replicas have the same name and signature.
     
     # Look up symbol name
     lookupSym = None
     
     # Dont check for imports
     if lookupCheck:
-      lookupSym = self.lookup(symbol.name, symbol.type, printError=False)
+      if (signature is None):
+        lookupSym = self.lookup(symbol.name, symbol.type, printError=False)
+      else:
+        lookupSym = self.lookupOverload(symbol.name, signature)
     
     # Add symbol
     if (lookupSym is None):
-      self._symbol[symbol.name] = (symbol.type, symbol)
+      if (signature is None):
+        self._symbol.setdefault(symbol.name, {})[symbol.type] = symbol
+      else:
+        self._overloads.setdefault(symbol.name, OrderedDict())[signature] = symbol
+      self._generations.bump(symbol.name)
       print('insert:T({0},{1})'.format(symbol.name, symbol.type))
       return True
     else:
@@ -69,65 +105,110 @@ class SymbolTable (object):
     else:
       nameStr = name
       
-    # Look for type in current scope
-    symbolList = self._symbol.get(nameStr)
-    
-    if (symbolList is None):
-      # Symbol not found, look in enclosing scope
-      if (self.enclosingScope is None):
-        # All scopes didnt find type
-        if (printError):
-          print('Symbol Name "{0}", Type "{1}" not found'.format(nameStr, type))
-        return None
-      else:
-        if recursive:
-          return self.enclosingScope.lookup(nameStr, type, printError=printError)
+    if isinstance(type, list):
+      key = (nameStr, tuple(type), recursive)
+    else:
+      key = (nameStr, type, recursive)
+    symbol = self.lookupCached(nameStr, key, lambda: self.lookupChain(nameStr, type, recursive))
+      
+    if (symbol is None) and printError and (recursive or (self.enclosingScope is None)):
+      # All scopes didnt find type
+      print('Symbol Name "{0}", Type "{1}" not found'.format(nameStr, type))
+      
+    return symbol
+    
+  def lookupOverload(self, name, signature, recursive=True):
+    # Overloaded symbol with exact signature, None if not found
+    if isinstance(name, Token):
+      nameStr = name.value
+    else:
+      nameStr = name
+      
+    key = (nameStr, 'overload', signature, recursive)
+    return self.lookupCached(nameStr, key, lambda: self.lookupOverloadChain(nameStr, signature, recursive))
+    
+  def lookupCached(self, nameStr, key, findSymbol):
+    # Use cached result if no symbol of that name changed since
+    generation = self._generations.get(nameStr)
+    cached = self._lookupCache.get(key)
+    if (cached is not None) and (cached[0] == generation):
+      return cached[1]
+      
+    symbol = findSymbol()
+    self._lookupCache[key] = (generation, symbol)
+    return symbol
+    
+  def lookupChain(self, nameStr, type, recursive):
+    # Walk this and enclosing scopes, first symbol with name and type wins
+    scope = self
+    while (scope is not None):
+      bucket = scope._symbol.get(nameStr)
+      
+      if (bucket is not None):
+        if (isinstance(type, str)):
+          if (type == 'all'):
+            return next(iter(bucket.values()))
+          elif (type in bucket):
+            return bucket[type]
         else:
-          return None
+          for symType in type:
+            if (symType in bucket):
+              return bucket[symType]
+          
+      # Symbol not found or wrong type, look in enclosing scope
+      if not recursive:
+        return None
+      scope = scope.enclosingScope
+      
+    return None
+    
+  def lookupOverloadChain(self, nameStr, signature, recursive):
+    # Walk this and enclosing scopes for the overload set of name
+    scope = self
+    while (scope is not None):
+      overloads = scope._overloads.get(nameStr)
+      if (overloads is not None) and (signature in overloads):
+        return overloads[signature]
         
+      if not recursive:
+        return None
+      scope = scope.enclosingScope
+      
+    return None
+    
+  def listOverloads(self, name, recursive=True):
+    # Signatures of all overloads of name in this and enclosing scopes,
+    # used to report calls no overload matched
+    if isinstance(name, Token):
+      nameStr = name.value
     else:
-      # Symbol found, check if type exists
-      if (isinstance(type, str)):
-        if (type == 'all'):
-          return symbolList[1]
-        elif (type == symbolList[0]):
-          # Return symbol for index
-          return symbolList[1]
-        else:
-          # Correct symbol name, wrong type
-          # Symbol not found, look in enclosing scope
-          if (self.enclosingScope is None):
-            # All scopes didnt find type
-            if (printError):
-              print('Symbol Name "{0}", Type "{1}" not found'.format(nameStr, type))
-            return None
-          else:
-            if recursive:
-              return self.enclosingScope.lookup(nameStr, type, printError=printError)
-            else:
-              return None
+      nameStr = name
+      
+    signatures = []
+    scope = self
+    while (scope is not None):
+      for sig in scope._overloads.get(nameStr, {}):
+        if (sig not in signatures):
+          signatures.append(sig)
           
-      elif (isinstance(type, list)):
-        if (symbolList[0] in type):
-          # Symbol name and type match, return symbol
-          return symbolList[1]
-        else:
-          # Correct symbol name, wrong type
-          # Symbol not found, look in enclosing scope
-          if (self.enclosingScope is None):
-            # All scopes didnt find type
-            if (printError):
-              print('Symbol Name "{0}", Type "{1}" not found'.format(nameStr, type))
-            return None
-          else:
-            if recursive:
-              return self.enclosingScope.lookup(nameStr, type, printError=printError)
-            else:
-              return None
-              
+      if not recursive:
+        break
+      scope = scope.enclosingScope
+      
+    return signatures
+    
+  def iterSymbols(self):
+    # Yield (type, symbol) of every symbol in this scope, overloads last
+    for bucket in self._symbol.values():
+      yield from bucket.items()
+    for overloads in self._overloads.values():
+      # A symbol is in the set once per signature it can be called with
+      for sym in OrderedDict((id(x), x) for x in overloads.values()).values():
+        yield (sym.type, sym)
+        
   def returnSymbolList(self, typeLookup):
     symList = []
-    for name,sym in iter(self._symbol.items()):
+    for sym in self.iterSymbols():
       if (sym[0] in typeLookup):
         symList.append(sym[1])
           
@@ -135,7 +216,7 @@ class SymbolTable (object):
         
   def returnParams(self):
     params = []
-    for name,sym in iter(self._symbol.items()):
+    for sym in self.iterSymbols():
       if (sym[1].isParameter()):
         params.append(sym[1])
           
@@ -143,9 +224,15 @@ class SymbolTable (object):
     
   def removeImports(self):
     # Look for all imports and remove them
-    for name,sym in iter(self._symbol.items()):
-      if (sym[1].isImported()):
-        del self._symbol[name]
+    for table in [self._symbol, self._overloads]:
+      for name,bucket in list(table.items()):
+        for key,sym in list(bucket.items()):
+          if (sym.isImported()):
+            del bucket[key]
+            self._generations.bump(name)
+            
+        if not bucket:
+          del table[name]
         
   def status(self):
     # Plot header
@@ -200,11 +287,11 @@ class SymbolTable (object):
     varNum   = 0
     taskNum  = 0
     typeNum  = 0
-    for name,sym in iter(self._symbol.items()):
+    for sym in self.iterSymbols():
       found = True
       symbol = sym[1]
       
-      for name,sym in iter(symbol._symbol.items()):
+      for sym in symbol.iterSymbols():
         if (sym[0] is 'signal'):
           varNum += 1
         elif (sym[0] is 'trait'):
@@ -241,7 +328,7 @@ class SymbolTable (object):
     
     # List types
     found = False
-    for name,sym in iter(self._symbol.items()):
+    for sym in self.iterSymbols():
       if sym[0] is 'type':
         found = True
         symbol = sym[1]
@@ -269,7 +356,7 @@ class SymbolTable (object):
     
     # List types
     found = False
-    for name,sym in iter(self._symbol.items()):
+    for sym in self.iterSymbols():
       if sym[0] is 'generic':
         found = True
         symbol = sym[1]
@@ -294,7 +381,7 @@ class SymbolTable (object):
     
     # List functions
     found = False
-    for name,sym in iter(self._symbol.items()):
+    for sym in self.iterSymbols():
       if sym[0] is 'function':
         found = True
         symbol = sym[1]
@@ -332,7 +419,7 @@ class SymbolTable (object):
     
     # List functions
     found = False
-    for name,sym in iter(self._symbol.items()):
+    for sym in self.iterSymbols():
       if sym[0] is 'attr':
         found = True
         symbol = sym[1]
@@ -371,7 +458,7 @@ class SymbolTable (object):
     
     # List variables
     found = False
-    for name,sym in iter(self._symbol.items()):
+    for sym in self.iterSymbols():
       if sym[0] is symName:
         found = True
         symbol = sym[1]
@@ -382,7 +469,7 @@ class SymbolTable (object):
         varNum   = 0
         taskNum  = 0
         typeNum  = 0
-        for name,sym in iter(symbol._symbol.items()):
+        for sym in symbol.iterSymbols():
           if (sym[0] is 'signal'):
             varNum += 1
           elif (sym[0] is 'trait'):
@@ -433,14 +520,14 @@ class SymbolTable (object):
     
     # List variables
     found = False
-    for name,sym in iter(self._symbol.items()):
+    for sym in self.iterSymbols():
       if sym[0] is 'module':
         found = True
         symbol = sym[1]
        
         genNum  = 0
         portNum = 0
-        for name,sym in iter(symbol._symbol.items()):
+        for sym in symbol.iterSymbols():
           if (sym[0] is 'signal'):
             if (sym[1].isPort()):
               portNum += 1
@@ -472,7 +559,7 @@ class SymbolTable (object):
     
     # List variables
     found = False
-    for name,sym in iter(self._symbol.items()):
+    for sym in self.iterSymbols():
       if sym[0] is 'signal':
         found = True
         symbol = sym[1]
@@ -1,8 +1,11 @@
 from copy import deepcopy
 import numpy as np
 
+from ASTSchema import BaseAST
+from ASTSchema import bitString
 from SymbolTable import SymbolTable
 from SymbolCheckers import SignalChecker, ParamChecker, ReturnStmtChecker, IndexChecker, TypeTraitChecker
+from SymbolCheckers import freezeValue
 
 
 # All symbols inherit from base symbol
@@ -10,7 +13,8 @@ class BaseSymbol (object):
   def __init__(self,name,type,ast=None):
     self.name        = name
     self.type        = type
-    self.ast         = deepcopy(ast)
+    # AST is shared with the parse tree, analysis must not modify it
+    self.ast         = ast
     # Will be replaced, have limited values compared to signals
     self._parameter  = False
     # Symbol imported, only necessary for debug
@@ -124,7 +128,8 @@ class BuiltinTypeSymbol (BaseSymbol, SymbolTable, ParamChecker, TypeTraitChecker
     # Add builtin type signals
     for methodDef in builtinMethod:
       funcSym = TypeMethodSymbol(methodDef, self)
-      self.insert(funcSym)
+      for sig in funcSym.overloadSignatures():
+        self.insert(funcSym, signature=sig)
       
   def addTypeSymbol(self):
     # Add type symbols to parameters
@@ -183,7 +188,7 @@ class ProcessSymbol (BaseSymbol, SymbolTable, ParamChecker):
     
 class LibrarySymbol (BaseSymbol, SymbolTable):
   def __init__(self, node, encScope):
-    if (type(node).__name__ == 'BaseAST'):
+    if (isinstance(node, BaseAST)):
       self.__initGen__(node.name, encScope, node)
     elif (type(node).__name__ == 'Token'):
       self.__initGen__(node.value, encScope, None)
@@ -250,7 +255,6 @@ class ImplSymbol (BaseSymbol, SymbolTable):
 # Define user defined function symbol
 class FuncSymbol (BaseSymbol, SymbolTable, ParamChecker, ReturnStmtChecker):
   def __init__(self, node, encScope):
-    print('\n'.join(node.log()))
     BaseSymbol.__init__(self, node.name.value, 'function', node)
     SymbolTable.__init__(self, node.name.value, encScope.scopeLevel+1, encScope)
     ReturnStmtChecker.__initClass__(self)
@@ -269,13 +273,12 @@ class EnumStateSymbol (BaseSymbol):
 # Define symbols from builtin or user defined sources
 class ParamSymbol (BaseSymbol, SignalChecker, IndexChecker):
   def __init__(self, node):
-    if (type(node).__name__ == 'BaseAST'):
+    if (isinstance(node, BaseAST)):
       self.__initClass__(node)
-    elif (type(node).__name__ == 'dict'):
+    elif (isinstance(node, dict)):
       self.__initDict__(node)
       
     self.typeSym     = None
-    self.value       = None
     self.const       = False
     self.setParameter()
       
@@ -283,22 +286,29 @@ class ParamSymbol (BaseSymbol, SignalChecker, IndexChecker):
     BaseSymbol.__init__(self, node.name, 'signal', node)
     self.typeName    = node.type
     self.typeDim     = node.dim
+    self.value       = None
     
     
   def __initDict__(self, node):
     BaseSymbol.__init__(self, node['name'], 'signal')
     self.typeName    = node['typeName']
     self.typeDim     = self.determineDim(node['array'])
+    # Default value from config, None is written as a plain word.
+    # Defaults are shared by every call, frozen once here.
+    self.value       = None if (node['value'] == 'None') else freezeValue(node['value'])
     
   def addTypeSymbol(self, typeSym):
     self.typeSym     = typeSym
+    
+  def getFrozenValue(self):
+    return self.value
 
 # 
 class SignalSymbol (BaseSymbol, SignalChecker, IndexChecker):
   def __init__(self, node, typeSym, inputParams):
-    if (type(node).__name__ == 'BaseAST'):
+    if (isinstance(node, BaseAST)):
       self.__initClass__(node)
-    elif (type(node).__name__ == 'dict'):
+    elif (isinstance(node, dict)):
       self.__initDict__(node)
       
     self.typeParams  = inputParams
@@ -315,6 +325,8 @@ class SignalSymbol (BaseSymbol, SignalChecker, IndexChecker):
     self.value         = np.empty(1, dtype='O')
     self.initAsgnd     = np.full(1, False, dtype=bool)
     self.valAsgnd      = np.full(1, False, dtype=bool)
+    # Read-only snapshot of value, made on first use after it changes
+    self.frozenValue   = None
     
   def __initClass__(self, node):
     if (type(node.name).__name__ == 'str'):
@@ -328,6 +340,11 @@ class SignalSymbol (BaseSymbol, SignalChecker, IndexChecker):
     self.typeName    = node.typeName.name
     if (node.base is 'CONST'):
       self.typeDim   = 0
+    elif (node.base == 'BITS'):
+      self.typeDim   = 1
+    elif (node.base == 'CONST_ARRAY'):
+      # Indexed [0:len-1] like a declared array
+      self.typeDim   = self.determineDim([[0, len(node.value)-1]])
     else:
       self.typeDim   = self.determineDim(node.array)
     self.const       = node.const
@@ -356,6 +373,8 @@ class SignalSymbol (BaseSymbol, SignalChecker, IndexChecker):
     return self.port
     
   def setArray(self, array):
+    # Dimensions follow the resolved array, not the indices in the AST
+    self.typeDim     = self.determineDim(array)
     self.flipInd     = [x[0] > x[1] for x in array]
     self.array       = [list(self.arraySize(x)[0:2]) for x in array]
     
@@ -366,12 +385,34 @@ class SignalSymbol (BaseSymbol, SignalChecker, IndexChecker):
     self.value         = np.empty(arrayDim, dtype='O')
     self.initAsgnd     = np.full(arrayDim, False, dtype=bool)
     self.valAsgnd      = np.full(arrayDim, False, dtype=bool)
+    self.frozenValue   = None
+    
+  def getFrozenValue(self):
+    # Value shared with calls and returns, frozen once per assignment
+    if self.frozenValue is None:
+      self.frozenValue = freezeValue(self.value)
+    return self.frozenValue
     
   def assignConstValue(self, value):
+    self.frozenValue = None
     self.value[[0,0]] = value
     self.initAsgnd[[0,0]] = True
     self.valAsgnd[[0,0]] = True
     
+  def assignBitsValue(self, node):
+    # Unpack BITS literal in one pass, bit 0 is the LSB
+    self.frozenValue = None
+    self.value[:] = list(reversed(bitString(node)))
+    self.initAsgnd[:] = True
+    self.valAsgnd[:] = True
+    
+  def assignArrayValue(self, values):
+    # Assign whole constant array at once
+    self.frozenValue = None
+    self.value[:] = values
+    self.initAsgnd[:] = True
+    self.valAsgnd[:] = True
+    
   def assignInitValue(self, node, index=None):
     # Verify type
     if (node.typeName != self.typeName):
@@ -406,6 +447,7 @@ class SignalSymbol (BaseSymbol, SignalChecker, IndexChecker):
       raise Exception('Variable Index assigned')
       
     # Assign value
+    self.frozenValue = None
     self.value[arrayInd] = node.value
     self.initAsgnd[arrayInd] = True
     
@@ -459,4 +501,40 @@ class SignalSymbol (BaseSymbol, SignalChecker, IndexChecker):
         
     return True
     
-
+#Result of an expression, built from its left operand. Read-only so it
+#can be passed on and stored without copying.
+class ExprResult (object):
+  __slots__ = ('name', 'type', 'typeName', 'typeDim', 'typeSym', 'typeParams', 'const', 'portType', 'array', 'value', 'symbol')
+  
+  def __init__(self, sym, value, array):
+    for attr in ['name', 'type', 'typeName', 'typeDim', 'typeSym', 'typeParams', 'const', 'portType']:
+      object.__setattr__(self, attr, getattr(sym, attr, None))
+    object.__setattr__(self, 'array', freezeValue(array))
+    object.__setattr__(self, 'value', freezeValue(value))
+    # Operand symbol the result was built from
+    object.__setattr__(self, 'symbol', sym)
+    
+  def __setattr__(self, attr, val):
+    raise TypeError('Expression results are read-only')
+    
+  def __delattr__(self, attr):
+    raise TypeError('Expression results are read-only')
+    
+  # Symbol queries are answered by the operand symbol
+  def isParameter(self):
+    return self.symbol.isParameter()
+    
+  def isImported(self):
+    return self.symbol.isImported()
+    
+  def isReferenced(self):
+    return self.symbol.isReferenced()
+    
+  def gotReferenced(self):
+    self.symbol.gotReferenced()
+    
+  def getName(self):
+    return self.symbol.getName()
+    
+  def getFrozenValue(self):
+    return self.value
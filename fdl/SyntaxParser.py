@@ -1,12 +1,18 @@
 from Lexer import Lexer
 from Lexer import Token
+from ASTSchema import BaseAST
+from ASTSchema import packBits
+from FileCache import FileCache
 import re
 import numpy as np
 from pathlib import Path
-from copy import deepcopy
+from copy import copy, deepcopy
 
 from enum import Enum
 
+# Bump when the AST built for a source changes, cached trees are then ignored
+PARSER_VERSION = 5
+
 def determineBits(intVal):
   if (intVal == 0):
     return 2
@@ -41,90 +47,10 @@ class SimpleScope(object):
     
   def report(self):
     print('Scope = {0}'.format(str(self.scope)))
-
-#Create an abstract class for abstract-syntax tree (AST)
-class BaseAST(object):
-  def __init__(self, base, comments, grammerDict):
-    #Base name
-    self.base   = base
-    
-    #Comments included
-    self.comments = comments
-    
-    #Add variables based on dict values
-    for var, val in iter(grammerDict.items()):
-      setattr(self, var, val)
-            
-  def log(self,tabLevel=0):
-    attr = []
-    node = []
-    lines = []
-    
-    if (self.base is 'CONST'):
-      lines.append(self.logConst())
-      return lines
-    
-    lines.append('{0}{1}'.format(tabLevel*' ', self.base))
-    lines.append('{0}{1}: {2}'.format((tabLevel+2)*' ', 'comments', self.comments))
-    tabLevel += 2
-    for var, val in iter(self.__dict__.items()):
-      if (var in ['base', 'comments']):
-        continue
-      
-      typeStr = type(val).__name__
-      # Loop over list
-      if (typeStr == 'list'):
-        a,b = self.logList(tabLevel, var, val)
-        node = node + a
-        attr = attr + b
-      elif (typeStr == 'BaseAST'):
-        nodeList = val.log(tabLevel)
-        nodeList[0] = '{0}{1}: '.format(tabLevel*' ', var)+ nodeList[0].lstrip()
-        node = node + nodeList
-      else:
-        attr.append('{0}{1}: {2}'.format(tabLevel*' ', var, val))
-        
-    lines = lines + attr
-    lines = lines + node
-    
-    return lines
-    
-  def logList(self, tabLevel, var, val, ind=[]):
-    attr = []
-    node = []
-    for d in range(len(val)):
-      valItem = val[d]
-      if (type(valItem).__name__ == 'list'):
-        tmpInd = ind + [d]
-        a,b = self.logList(tabLevel, var, valItem, tmpInd)
-        node = node + a
-        attr = attr + b
-      elif (type(valItem).__name__ == 'BaseAST'):
-        tmpInd = ind + [d]
-        nodeList = valItem.log(tabLevel)
-        nodeList[0] = '{0}{1}{2}: '.format(tabLevel*' ', var, tmpInd)+ nodeList[0].lstrip()
-        node = node + nodeList
-      else:
-        tmpInd = ind + [d]
-        attr.append('{0}{1}{2}: {3}'.format(tabLevel*' ', var, tmpInd, valItem))
-        
-    #if not attr:
-    #  attr.append('{0}{1}: []'.format(tabLevel*' ', var))
-        
-    return (node, attr)
-    
-  def logConst(self):
-    # special case for const to reduce lines down
-    base = self.base
-    type = self.typeName
-    typeParam = self.params
-    typeParam = str(typeParam)[1:-1]
-    value = self.value
-    return '{0} {1}({2}) = {3}'.format(base, type, typeParam, value)
     
 def createIntNode(value):
   intConstDict = {}
-  intConstDict['typeName']   = BaseAST('TYPE', [], {'name': ['uint']})
+  intConstDict['typeName']   = BaseAST('TYPE', {'name': ['uint']})
   intConstDict['params'] = determineBits(value)
   intConstDict['value']  = value
   intConstDict['name']   = 'const'
@@ -132,65 +58,257 @@ def createIntNode(value):
   intConstDict['port']   = False
   intConstDict['decl']   = True
   
-  return BaseAST('CONST',[],intConstDict)
+  return BaseAST('CONST', intConstDict)
   
-def createBitArray(value):
-  bitDictArray = []
-  for val in value:
-    bitDict = {}
-    bitDict['typeName'] = BaseAST('TYPE', [], {'name': ['bit']})
-    bitDict['params']   = []
-    bitDict['value']    = val
-    bitDict['name']     = 'const'
-    bitDict['const']    = True
-    bitDict['port']     = False
-    bitDict['decl']     = True
-    
-    bitDictArray.append(BaseAST('CONST',[],bitDict))
-    
-  if len(bitDictArray) == 1:
-    return bitDictArray[0]
+def createBitArray(token, value, width=None):
+  # Single bit stays a bit CONST, vectors are one packed BITS node.
+  # value is the 01ZXLH_- string, or the int of a hex literal with width.
+  bitDict = {}
+  bitDict['token']    = token
+  bitDict['typeName'] = BaseAST('TYPE', {'name': ['bit']})
+  bitDict['params']   = []
+  bitDict['name']     = 'const'
+  bitDict['const']    = True
+  bitDict['port']     = False
+  bitDict['decl']     = True
+    
+  if width is None:
+    # '_' only separates digits
+    value = value.replace('_', '')
+    width = len(value)
+    if (width == 1):
+      bitDict['value'] = value
+      return BaseAST('CONST', bitDict)
+    (value, mask, states) = packBits(value)
   else:
-    aggDict = {'nodes': bitDictArray}
-    return BaseAST('AGGREGATE',[],aggDict)
+    (mask, states) = (0, {})
+    
+  bitDict['width']  = width
+  bitDict['value']  = value
+  bitDict['mask']   = mask
+  bitDict['states'] = states
+  return BaseAST('BITS', bitDict)
     
 defaultArray = [[createIntNode(0), createIntNode(0)]]
 
+#Syntax error found by the parser. Only plain values are kept so
+#diagnostics can be pickled back from parser processes.
+class Diagnostic(object):
+  def __init__(self, filename, token, lineText, expected, message, expectedScope):
+    self.filename      = filename
+    self.lineNo        = token.lineNo
+    self.charNo        = token.charNo
+    self.type          = token.type
+    self.value         = token.value
+    self.scope         = token.scope
+    self.lineText      = lineText
+    self.expected      = expected
+    self.message       = message
+    self.expectedScope = expectedScope
+  
+  def __str__(self):
+    lineNoStrLen = len(str(self.lineNo))
+    lines = []
+    lines.append('Unexpected syntax: line #{0} (Value: {1})'.format(self.lineNo, self.value))
+    lines.append('Filename: {0}'.format(self.filename))
+    lines.append('{0}: {1}'.format(str(self.lineNo).rjust(lineNoStrLen, ' '), self.lineText))
+    lines.append(' '*(self.charNo+2+lineNoStrLen) + '^')
+    lines.append(' '*(self.charNo+2+lineNoStrLen) + '|')
+    if (self.expected is not None):
+      lines.append('Expected Token {0} but got {1}, value="{2}"'.format(self.expected, self.type, self.value))
+    
+    if (self.message is not None):
+      lines.append(self.message)
+    
+    if (self.expectedScope != self.scope): 
+      lines.append('Expected Scope {0} but got {1}'.format(self.expectedScope, self.scope))
+    
+    return '\n'.join(lines)
+
+#Raised for syntax errors, holds the diagnostics of the file
+class ParseError(Exception):
+  def __init__(self, diagnostics):
+    Exception.__init__(self, 'Unexpected syntax')
+    self.diagnostics = diagnostics
+  
+  def __reduce__(self):
+    return (ParseError, (self.diagnostics,))
+
 class SyntaxParser(object):
-  def __init__(self, lexer):
+  def __init__(self, lexer, cacheDir=None, recover=False, keepComments=True):
     self.lexer = lexer
     
     self.token = None
     self.scope = None
-  
-  def error(self, expectedTokenType=None, errorStr=None):
-    tType = self.getType()
-    tVal = self.token.value
-    tScope = self.getScope()
     
-    # Determine line number length
-    lineNo = self.token.lineNo
-    lineNoStrLen = len(str(lineNo))
+    # Comments of each node, kept outside the nodes. Without keepComments
+    # comments are skipped like EOL and the table stays empty.
+    self.keepComments = keepComments
+    self.commentTable = {}
     
-    print('Unexpected syntax: line #{0} (Value: {1})'.format(lineNo, tVal))
-    print('Filename: {0}'.format(self.fdl_filename))
+    # In recovery mode syntax errors are collected, parsing resumes at
+    # the next line at or left of the scope where the error occurred
+    self.recover     = recover
+    self.diagnostics = []
     
-    # only print previous line if lineNo is not negative
-    print('{0}: {1}'.format(str(lineNo).rjust(lineNoStrLen, ' '), self.lexer.getTextLine(lineNo)))
-      
-    print(' '*(self.token.charNo+2+lineNoStrLen) + '^')
-    print(' '*(self.token.charNo+2+lineNoStrLen) + '|')
-    if (expectedTokenType is not None):
-      print('Expected Token {0} but got {1}, value="{2}"'.format(expectedTokenType, tType, tVal))
-      
-    if (errorStr is not None):
-      print(errorStr)
-      
-    if (self.scope.get() != tScope): 
-      print('Expected Scope {0} but got {1}'.format(self.scope.get(), tScope))
+    # Parsed trees are cached on disk when a cache directory is given
+    self.cache = FileCache(cacheDir) if (cacheDir is not None) else None
+  
+    #Token kinds are small integers taken from the lexer grammar
+    self.kindIds   = dict(lexer.kindIds)
+    self.kindNames = lexer.kindNames
+    
+    #Token kind sets for membership checks
+    self.commentKinds    = self.kindSet(['COMMENT', 'COMMENT_HEADER', 'COMMENT_FMT'])
+    self.skipKinds       = self.kindSet(['COMMENT', 'COMMENT_HEADER', 'COMMENT_FMT', 'EOL'])
+    self.baseDeclKinds   = self.kindSet(['STRUCT', 'INTERFACE', 'TRAIT', 'IMPL', 'FUNC', 'TASK', 'ENUM', 'ATTR', 'ID', 'CONST'])
+    self.selfDeclKinds   = self.kindSet(['STRUCT', 'INTERFACE', 'TRAIT', 'IMPL', 'FUNC', 'TASK', 'ENUM', 'ATTR', 'ID', 'CONST', 'SELFTYPE'])
+    self.traitDeclKinds  = self.kindSet(['FUNC', 'TASK', 'ATTR', 'CONST'])
+    self.idKinds         = self.kindSet(['ID'])
+    self.idTypeKinds     = self.kindSet(['ID', 'SELFTYPE'])
+    self.idValueKinds    = self.kindSet(['ID', 'SELFVALUE'])
+    self.portKinds       = self.kindSet(['BASE_INTERFACE', 'EXT_INTERFACE'])
+    self.attrOpKinds     = self.kindSet(['ADD_OPER', 'ASSIGN'])
+    self.funcDeclKinds   = self.kindSet(['ID', 'RELATION_OPER', 'LOGICAL_OPER', 'MOD_REM_OPER', 'NOT_OPER'])
+    self.funcKinds       = self.kindSet(['ID', 'LOGICAL_OPER', 'MOD_REM_OPER', 'NOT_OPER'])
+    self.callKinds       = self.kindSet(['LPAREN', 'LT'])
+    self.archNameKinds   = self.kindSet(['ID', 'BLACKBOX'])
+    self.reportKinds     = self.kindSet(['PRINT', 'WARNING', 'ERROR'])
+    self.asgnKinds       = self.kindSet(['ASSIGN', 'CMPD_ARITH_ASSIGN', 'CMPD_LOGICAL_ASSIGN', 'POST_OPER'])
+    self.constKinds      = self.kindSet(['INTEGER', 'FLOAT', 'BIT_INIT_HEX', 'BIT_INIT_BIN', 'STRING', 'BOOLEAN'])
+    self.unaryOpKinds    = self.kindSet(['ADD_OPER', 'SUB_OPER', 'NOT_OPER'])
+    self.signKinds       = self.kindSet(['ADD_OPER', 'SUB_OPER'])
+    self.numberKinds     = self.kindSet(['INTEGER', 'FLOAT'])
+    
+    #Binary operator table, (precedence, node base). Higher precedence
+    #binds tighter, all binary operators are left associative.
+    self.binaryOps = self.kindTable({
+      'LOGICAL_OPER':  (1, 'EXPR'),
+      'RELATION_OPER': (2, 'EXPR'),
+      'GT':            (2, 'EXPR'),
+      'LT':            (2, 'EXPR'),
+      'ADD_OPER':      (3, 'EXPR'),
+      'SUB_OPER':      (3, 'EXPR'),
+      'CAT':           (3, 'CAT'),
+      'STAR':          (4, 'EXPR'),
+      'DIV':           (4, 'EXPR'),
+      'MOD_REM_OPER':  (4, 'EXPR'),
+      'EXP_OPER':      (5, 'EXPR'),
+    })
+    
+    #Dispatch from leading token to file level declaration. Tables hold
+    #unbound methods, so parse contexts copied from this parser share them.
+    parser = type(self)
+    self.fileDeclLoaders = self.kindTable({
+      'IMPORT':    parser.loadImportDecl,
+      'MODULE':    parser.loadModuleDecl,
+      'ARCH':      parser.loadArchDecl,
+      'LIBRARY':   parser.loadLibraryDecl,
+      'STRUCT':    parser.loadStructDecl,
+      'INTERFACE': parser.loadInterfaceDecl,
+      'TRAIT':     parser.loadTraitDecl,
+      'IMPL':      parser.loadImplDecl,
+      'FUNC':      parser.loadFunctionDecl,
+      'TASK':      parser.loadTaskDecl,
+      'ENUM':      parser.loadEnumDecl,
+      'CONST':     lambda self: self.loadVarDecl('const'),
+      'ATTR':      parser.loadAttrDecl,
+    })
+    self.fileDeclKinds = frozenset(self.fileDeclLoaders)
+    
+    #Dispatch from leading token to logic statement, loaders take the logic type
+    self.statementLoaders = self.kindTable({
+      'SPRO':      lambda self, logicType: self.loadSpro(),
+      'APRO':      lambda self, logicType: self.loadApro(),
+      'PRO':       lambda self, logicType: self.loadPro(),
+      'FOR':       parser.loadFor,
+      'IF':        parser.loadIf,
+      'CASE':      parser.loadCase,
+      'RENAME':    lambda self, logicType: self.loadRename(),
+      'ASSERT':    lambda self, logicType: self.loadAssert(),
+      'REPORT':    lambda self, logicType: self.loadReport(),
+      'RETURN':    lambda self, logicType: self.loadReturn(),
+      'ATTR':      lambda self, logicType: self.loadAttrDecl(),
+      'LPAREN':    lambda self, logicType: self.loadAssignment(),
+      'ID':        parser.loadIdStatement,
+      'SELFVALUE': parser.loadIdStatement,
+    })
+    self.statementKinds = frozenset(self.statementLoaders)
+    
+    #Logic types a statement is not allowed in
+    self.statementRestrict = self.kindTable({
+      'SPRO':   ([LogicEnum.func, LogicEnum.proc], 'Detected a synchronous process, not allowed in this contexted'),
+      'APRO':   ([LogicEnum.func, LogicEnum.proc], 'Detected an asynchronous process, not allowed in this contexted'),
+      'PRO':    ([LogicEnum.func, LogicEnum.proc], 'Detected a user-defined process, not allowed in this contexted'),
+      'RENAME': ([LogicEnum.func, LogicEnum.proc, LogicEnum.task], 'Detected a rename statement, not allowed in this contexted'),
+      'REPORT': ([LogicEnum.arch, LogicEnum.task], 'Detected a report statement, not allowed in this contexted'),
+      'RETURN': ([LogicEnum.arch, LogicEnum.proc], 'Detected a report statement, not allowed in this contexted'),
+      'ATTR':   ([LogicEnum.proc], 'Detected an attribute statement, not allowed in this contexted'),
+    })
+  
+  # Convert token names to frozenset of kinds, names not in grammar never match
+  def kindSet(self, tokenTypes):
+    return frozenset(self.kindIds[x] for x in tokenTypes if x in self.kindIds)
+  
+  # Convert dict keyed by token names to dict keyed by kinds
+  def kindTable(self, tokenDict):
+    return {self.kindIds[x]: y for (x, y) in tokenDict.items() if x in self.kindIds}
+  
+  def error(self, expectedTokenType=None, errorStr=None):
+    if (type(expectedTokenType) is frozenset):
+      expectedTokenType = [x for x in self.kindNames if self.kindIds[x] in expectedTokenType]
+      
+    lineText = self.lexer.getTextLine(self.token.lineNo)
+    diag = Diagnostic(self.fdl_filename, self.token, lineText, expectedTokenType, errorStr, self.scope.get())
+      
+    # Recovery mode reports all diagnostics once the file is parsed,
+    # errors of enclosing blocks at the same token are only reported once
+    if self.recover:
+      lastDiag = self.diagnostics[-1] if self.diagnostics else None
+      if ((lastDiag is None) or ((lastDiag.lineNo, lastDiag.charNo) != (diag.lineNo, diag.charNo))):
+        self.diagnostics.append(diag)
+    else:
+      print(diag)
       
     #self.lexer.debug()
-    raise Exception('Unexpected syntax')
+    raise ParseError([diag])
+  
+  def tryLoad(self, loader, *args):
+    # Load with loader, in recovery mode a syntax error is recorded and
+    # None is returned once the parser has resynchronized
+    if not self.recover:
+      return loader(*args)
+    
+    startToken = self.token
+    scopeDepth = len(self.scope.scope)
+    try:
+      node = loader(*args)
+      
+      # Items end with their line, leftover tokens are an error of the item
+      if not (self.atLineStart() or self.check('EOF')):
+        self.error(errorStr='Unexpected tokens at end of line')
+      return node
+    except ParseError:
+      del self.scope.scope[scopeDepth:]
+      self.resync(startToken)
+      return None
+  
+  def resync(self, startToken):
+    # Skip to the first token of a line at or left of the current scope,
+    # always moving past startToken so parsing makes progress
+    scope = self.scope.get()
+    while not self.check('EOF'):
+      # Token positions are per store, incremental lexers have one per line
+      moved = (self.token.store is not startToken.store) or (self.token.ind != startToken.ind)
+      if (moved and self.atLineStart()
+          and (self.token.kind not in self.skipKinds) and (self.getScope() <= scope)):
+        break
+      self.next()
+  
+  def atLineStart(self):
+    store = self.token.store
+    ind = self.token.ind
+    return (ind == 0) or (store.lines[ind] != store.lines[ind-1])
   
   # Read next token
   def next(self):
@@ -207,32 +325,30 @@ class SyntaxParser(object):
     comment = []
     
     #Get next token, skipping over comments
-    while (self.check(['COMMENT', 'COMMENT_HEADER', 'COMMENT_FMT', 'EOL'])):
+    while (self.token.kind in self.skipKinds):
       #Add comment to list
-      if (self.check(['COMMENT', 'COMMENT_HEADER', 'COMMENT_FMT'])):
+      if (self.keepComments and (self.token.kind in self.commentKinds)):
         comment.append(self.getToken())
         
       self.next()
       
     return comment
     
-  # can check str or list of str
+  # can check token name or frozenset of token kinds
   def check(self, expectedTokenType, checkScope=False):
     if (type(expectedTokenType) is str):
-      tokenGood = (self.token.type == expectedTokenType)
+      tokenGood = (self.token.kind == self.kindIds.get(expectedTokenType))
+    elif (type(expectedTokenType) is frozenset):
+      tokenGood = (self.token.kind in expectedTokenType)
     elif (type(expectedTokenType) is list):
-      tokenGood = (self.token.type in expectedTokenType)
+      tokenGood = (self.token.kind in self.kindSet(expectedTokenType))
     else:
       raise Exception('Parser: Check type "{0}" not valid'.format(type(expectedTokenType)))
       
-    # Check if scope is good
-    if checkScope:
-      scopeGood = self.checkScope()
-    else:
-      scopeGood = True
-      
     # Determine if scope and token are good
-    return (tokenGood and scopeGood)
+    if (tokenGood and checkScope):
+      return self.checkScope()
+    return tokenGood
     
   def checkScope(self):
     return (self.getScope() == self.scope.get())
@@ -264,9 +380,48 @@ class SyntaxParser(object):
     self.scope.rm()
     
   def parse(self, file_str, fdl_filename, importName):
+    # Each call parses in its own context, so one parser can serve
+    # several threads. Return cached tree if source, grammar and parser
+    # are unchanged.
+    if (self.cache is None):
+      return self.newContext().parseFile(file_str, fdl_filename, importName)
+    
+    cacheName = 'ast-' + FileCache.key(str(PARSER_VERSION), str(self.keepComments), self.lexer.grammar.digest, file_str)
+    fileNode = self.cache.load(cacheName)
+    if (isinstance(fileNode, BaseAST) and (fileNode.base == 'FILE')):
+      # Same source can be loaded under another name
+      fileNode.filename = fdl_filename
+      fileNode.name = Path(fdl_filename).stem
+      fileNode.importName = importName
+      return fileNode
+    
+    fileNode = self.newContext().parseFile(file_str, fdl_filename, importName)
+    self.cache.store(cacheName, fileNode)
+    return fileNode
+  
+  def newContext(self):
+    # Parser for a single parse call. It shares the read-only kind and
+    # dispatch tables, but owns its token, scope and lexer state.
+    context = copy(self)
+    context.lexer = self.lexer.newContext()
+    context.token = None
+    context.scope = None
+    context.diagnostics = []
+    context.commentTable = {}
+    return context
+  
+  def createNode(self, base, comments, nodeDict):
+    # Create node, its comments go to the comment table
+    node = BaseAST(base, nodeDict)
+    if comments:
+      self.commentTable[node] = comments
+    return node
+  
+  def parseFile(self, file_str, fdl_filename, importName, declLines=None):
     # Lexer needs to convert to tokens
     self.lexer.convert(file_str)
     self.fdl_filename = fdl_filename
+    self.commentTable = {}
     
     self.next()
     
@@ -279,90 +434,94 @@ class SyntaxParser(object):
     # Determine base scope
     self.scope = SimpleScope(self.getScope())
     
-    # Check for modules, libraries, and imports
+    # Check for modules, libraries, and imports, until eof is reached
     nodes = []
-    decl = ['IMPORT', 'MODULE', 'ARCH', 'LIBRARY', 'STRUCT', 'INTERFACE', 'TRAIT', 'IMPL', 'FUNC', 'TASK', 'ENUM', 'CONST', 'ATTR']
-    while (self.check(decl,True)):
-      self.checkScope()
-      if (self.getType() == 'IMPORT'):
-        nodes.append(self.loadImportDecl())
-      elif (self.getType() == 'MODULE'):
-        nodes.append(self.loadModuleDecl())
-      elif (self.getType() == 'ARCH'):
-        nodes.append(self.loadArchDecl())
-      elif (self.getType() == 'LIBRARY'):
-        nodes.append(self.loadLibraryDecl())
-      elif (self.getType() == 'STRUCT'):
-        nodes.append(self.loadStructDecl())
-      elif (self.getType() == 'INTERFACE'):
-        nodes.append(self.loadInterfaceDecl())
-      elif (self.getType() == 'TRAIT'):
-        nodes.append(self.loadTraitDecl())
-      elif (self.getType() == 'IMPL'):
-        nodes.append(self.loadImplDecl())
-      elif (self.getType() == 'FUNC'):
-        nodes.append(self.loadFunctionDecl())
-      elif (self.getType() == 'TASK'):
-        nodes.append(self.loadTaskDecl())
-      elif (self.getType() == 'ENUM'):
-        nodes.append(self.loadEnumDecl())
-      elif (self.getType() == 'CONST'):
-        nodes.append(self.loadVarDecl('const'))
-      elif (self.getType() == 'ATTR'):
-        nodes.append(self.loadAttrDecl())
-      else:
-        self.error()
+    if declLines is None:
+      declLines = []
+    self.loadFileDecls(nodes, declLines)
+    
+    # All errors of the file are raised together
+    if self.diagnostics:
+      raise ParseError(self.diagnostics)
       
     fileDict['filename'] = self.fdl_filename
     fileDict['name'] = Path(self.fdl_filename).stem
     fileDict['importName'] = importName 
     fileDict['nodes'] = nodes
-    
-    # see if eof is reached
-    if not(self.check('EOF')):
-      self.error(errorStr='Parse error, unknown character achieved')
+    fileDict['commentTable'] = self.commentTable
 
     # Create Root Node
-    return BaseAST('FILE', comments, fileDict)
+    return self.createNode('FILE', comments, fileDict)
+  
+  def loadFileDecls(self, nodes, declLines, endLine=None):
+    # Load top level declarations into nodes and their first line into
+    # declLines. Stops at EOF, or before a declaration starting at endLine
+    # or later.
+    while True:
+      while (self.check(self.fileDeclKinds,True)):
+        lineNo = self.token.lineNo
+        if ((endLine is not None) and (lineNo >= endLine)):
+          return
+        
+        node = self.tryLoad(self.fileDeclLoaders[self.token.kind], self)
+        if node is not None:
+          nodes.append(node)
+          declLines.append(lineNo)
+      
+      if self.check('EOF'):
+        break
+      self.tryLoad(self.error, None, 'Parse error, unknown character achieved')
     
   def loadBaseDecl(self, includeSelf=False):
     # Loop over all declarations
     declNodes =[]
-    decl = ['STRUCT', 'INTERFACE', 'TRAIT', 'IMPL', 'FUNC', 'TASK', 'ENUM', 'ATTR', 'ID', 'CONST']
+    dropped = False
+    decl = self.baseDeclKinds
     
     # If self included, check for SELFTYPE in signal
-    signalTokens = ['ID']
+    signalTokens = self.idKinds
     if includeSelf:
-      decl.append('SELFTYPE')
-      signalTokens.append('SELFTYPE')
+      decl = self.selfDeclKinds
+      signalTokens = self.idTypeKinds
       
     # loop through lines
     while (self.check(decl,True)):
       # Verify scope
       self.checkScope()
       
-      if (self.check('STRUCT')):
-        declNodes.append(self.loadStructDecl())
-      elif (self.check('INTERFACE')):
-        declNodes.append(self.loadInterfaceDecl())
-      elif (self.check('TRAIT')):
-        declNodes.append(self.loadTraitDecl())
-      elif (self.check('IMPL')):
-        declNodes.append(self.loadImplDecl())
-      elif (self.check('FUNC')):
-        declNodes.append(self.loadFunctionDecl())
-      elif (self.check('TASK')):
-        declNodes.append(self.loadTaskDecl())
-      elif (self.check('CONST')):
-        declNodes.append(self.loadVarDecl('const', includeSelf))
-      elif (self.check(signalTokens)):
-        declNodes.append(self.loadVarDecl('signal', includeSelf))
-      elif (self.check('ATTR')):
-        declNodes.append(self.loadAttrDecl())
-      elif (self.check('ENUM')):
-        declNodes.append(self.loadEnumDecl())
+      node = self.tryLoad(self.loadBaseDeclItem, signalTokens, includeSelf)
+      if node is not None:
+        declNodes.append(node)
+      else:
+        dropped = True
+    
+    # Block left empty by recovered errors is not reported again
+    if (dropped and not declNodes):
+      raise ParseError([])
         
     return declNodes
+  
+  def loadBaseDeclItem(self, signalTokens, includeSelf):
+    if (self.check('STRUCT')):
+      return self.loadStructDecl()
+    elif (self.check('INTERFACE')):
+      return self.loadInterfaceDecl()
+    elif (self.check('TRAIT')):
+      return self.loadTraitDecl()
+    elif (self.check('IMPL')):
+      return self.loadImplDecl()
+    elif (self.check('FUNC')):
+      return self.loadFunctionDecl()
+    elif (self.check('TASK')):
+      return self.loadTaskDecl()
+    elif (self.check('CONST')):
+      return self.loadVarDecl('const', includeSelf)
+    elif (self.check(signalTokens)):
+      return self.loadVarDecl('signal', includeSelf)
+    elif (self.check('ATTR')):
+      return self.loadAttrDecl()
+    elif (self.check('ENUM')):
+      return self.loadEnumDecl()
     
   def loadDeclareBlock(self, includeSelf=False):
     #Load line (DECLARE COLON)
@@ -388,7 +547,7 @@ class SyntaxParser(object):
     #Return to original scope
     self.rmScope()
     
-    return BaseAST(base, comment, declDict)
+    return self.createNode(base, comment, declDict)
     
   def loadLogicBlock(self, logicType):
     #Load line (LOGIC COLON)
@@ -416,7 +575,7 @@ class SyntaxParser(object):
     #Return to original scope
     self.rmScope()
     
-    return BaseAST(base, comment, logicDict)
+    return self.createNode(base, comment, logicDict)
     
   def loadImportDecl(self):
     # Load line IMPORT ID (DOT ID)* (AS ID)?
@@ -446,7 +605,7 @@ class SyntaxParser(object):
     comment = self.skip()
           
     # No import line, move on
-    return BaseAST(base, comment, importDict)
+    return self.createNode(base, comment, importDict)
     
   def loadLibraryDecl(self):
     # Load line (LIBRARY ID COLON)
@@ -469,7 +628,7 @@ class SyntaxParser(object):
     
     libDict['nodes'] = nodes
     
-    return BaseAST(base, comment, libDict)
+    return self.createNode(base, comment, libDict)
     
   def loadStructDecl(self):
     # Load line (INTERFACE ID GEN_TYPE_DECL? DECL_ARG_LIST? COLON)
@@ -510,7 +669,7 @@ class SyntaxParser(object):
       
     #Return field node
     structDict['fieldNodes'] = nodes
-    return BaseAST(base, comment, structDict)
+    return self.createNode(base, comment, structDict)
     
   def loadInterfaceDecl(self):
     # Load line (INTERFACE ID GEN_TYPE_DECL? DECL_ARG_LIST? COLON)
@@ -551,7 +710,7 @@ class SyntaxParser(object):
       
     #Return field node
     itfcDict['fieldNodes'] = nodes
-    return BaseAST(base, comment, itfcDict)
+    return self.createNode(base, comment, itfcDict)
     
   def loadTraitDecl(self):
     # Load line (TRAIT ID GEN_TYPE_DECL? COLON)
@@ -575,7 +734,7 @@ class SyntaxParser(object):
         
     if addSelfType:
       genDict = {'name': 'Self', 'typeBound': [], 'defaultType': None}
-      traitDict['generics'].append(BaseAST('GENTYPE', [], genDict))
+      traitDict['generics'].append(BaseAST('GENTYPE', genDict))
       
     self.verify('COLON')
     comment = self.skip()
@@ -590,7 +749,7 @@ class SyntaxParser(object):
       
     #Return field node
     traitDict['nodes'] = nodes
-    return BaseAST(base, comment, traitDict)
+    return self.createNode(base, comment, traitDict)
     
   def loadImplDecl(self):
     # There are two types of implementations
@@ -626,7 +785,7 @@ class SyntaxParser(object):
       else:
         typeGen = []
         
-      idName.base = 'TRAIT'
+      idName = self.createNode('TRAIT', self.commentTable.pop(idName, None), {'name': idName.name})
         
       # Pack data
       implDict['name'] = name
@@ -647,7 +806,7 @@ class SyntaxParser(object):
       # This is due to some traits with all inherent functions
       implDict['nodes'] = []
       comment = self.skip()
-      return BaseAST(base, comment, implDict)
+      return self.createNode(base, comment, implDict)
       
     
     self.verify('COLON')
@@ -663,14 +822,13 @@ class SyntaxParser(object):
       
     #Return field node
     implDict['nodes'] = nodes
-    return BaseAST(base, comment, implDict)
+    return self.createNode(base, comment, implDict)
     
   def loadTraitImplStatements(self):
     # Load trait statements
     # (CONST_VAR_DECL | ATTR_DECL | FUNC_DEF | FUNC_DECL | TASK_DEF | TASK_DECL)
     declNodes =[]
-    decl = ['FUNC', 'TASK', 'ATTR', 'CONST']
-    while (self.check(decl,True)):
+    while (self.check(self.traitDeclKinds,True)):
       # Verify scope
       self.checkScope()
       
@@ -756,7 +914,7 @@ class SyntaxParser(object):
     if (declType is 'port'):
       # Interface type
       varType['port'] = self.getToken()
-      self.verify(['BASE_INTERFACE','EXT_INTERFACE'])
+      self.verify(self.portKinds)
     elif (declType is 'interface'):
       # Interface type
       varType['port'] = self.getToken()
@@ -783,9 +941,9 @@ class SyntaxParser(object):
     comment = self.skip()
     
     if (declType in ['struct','interface']):
-      return BaseAST('FIELD', comment, varType)
+      return self.createNode('FIELD', comment, varType)
     else:
-      return BaseAST('DECL', comment, varType)
+      return self.createNode('DECL', comment, varType)
     
   def loadEnumDecl(self):
     # Load (ENUM ID ASSIGN LPAREN ID (COMMA ID)* RPAREN)
@@ -808,7 +966,7 @@ class SyntaxParser(object):
     enumDict['states'] = states
     comment = self.skip()
     
-    return BaseAST('ENUM',comment,enumDict)
+    return self.createNode('ENUM', comment, enumDict)
     
   def loadAttrDecl(self):
     # Load (ATTR_DECL = ATTR (ADD_OPER | ASSIGN) LPAREN ATTR_SPEC (COMMA ATTR_SPEC)* RPAREN)
@@ -816,7 +974,7 @@ class SyntaxParser(object):
     attrDict = dict()
     
     attrDict['type'] = 'ATTR_ADD' if (self.getType() == 'ADD_OPER') else 'ATTR_APPLY'
-    self.verify(['ADD_OPER', 'ASSIGN'])
+    self.verify(self.attrOpKinds)
     self.verify('LPAREN')
     
     # Load states
@@ -830,7 +988,7 @@ class SyntaxParser(object):
     
     comment = self.skip()
     
-    return BaseAST('ATTR', comment, attrDict)
+    return self.createNode('ATTR', comment, attrDict)
     
   def loadAttrSpec(self):
     # Load (ATTR_SPEC = ID ASSIGN SIMP_EXPR)
@@ -840,7 +998,7 @@ class SyntaxParser(object):
     self.verify('ASSIGN')
     specDict['value'] = self.loadSimpleExpr(False)
     
-    return BaseAST('ATTRSPEC', [], specDict)
+    return BaseAST('ATTRSPEC', specDict)
     
   def loadFunctionDecl(self, includeSelf=False):
     # Load line FUNC_DEF = FUNC FUNC_NAME GEN_TYPE_DECL? DECL_ARG_LIST? RARROW RETURN_TYPE
@@ -853,8 +1011,7 @@ class SyntaxParser(object):
     funcDict = dict()
     
     funcDict['name'] = self.getToken()
-    functionNames = ['ID', 'RELATION_OPER', 'LOGICAL_OPER', 'MOD_REM_OPER', 'NOT_OPER']
-    self.verify(functionNames)
+    self.verify(self.funcDeclKinds)
     
     # See if trait has generic types
     if (self.check('LT')):
@@ -875,7 +1032,7 @@ class SyntaxParser(object):
     else:
       funcDict['funcDef'] = True
       comment = self.skip()
-      return BaseAST(base, [], funcDict)
+      return BaseAST(base, funcDict)
     
     comment = self.skip()
     
@@ -894,7 +1051,7 @@ class SyntaxParser(object):
     #Return to original scope
     self.rmScope()
       
-    return BaseAST(base, comment, funcDict)
+    return self.createNode(base, comment, funcDict)
     
   def loadTaskDecl(self, includeSelf=False):
     # Load line TASK_DEF = TASK TASK_NAME (GEN_TYPE_DECL)? (DECL_ARG_LIST)? RARROW RETURN_TYPE
@@ -927,7 +1084,7 @@ class SyntaxParser(object):
       taskDict['taskDef'] = False
     else:
       taskDict['taskDef'] = True
-      return BaseAST(base, [], taskDict)
+      return BaseAST(base, taskDict)
     
     comment = self.skip()
     
@@ -946,7 +1103,7 @@ class SyntaxParser(object):
     #Return to original scope
     self.rmScope()
       
-    return BaseAST(base, comment, taskDict)
+    return self.createNode(base, comment, taskDict)
     
   def loadReturnType(self, includeSelf):
     # RETURN_TYPE = (LPAREN GEN_TYPE (COMMA GEN_TYPE)* RPAREN) | TYPE_NAME
@@ -1025,9 +1182,7 @@ class SyntaxParser(object):
     
     #Get name
     varType['name'] = self.getToken()
-    name = ['ID']
-    if (includeSelf):
-      name.append('SELFVALUE')
+    name = self.idValueKinds if includeSelf else self.idKinds
     self.verify(name)
     
     #See if default values are set
@@ -1038,7 +1193,7 @@ class SyntaxParser(object):
       #Get default value
       varType['value'] = self.loadComplexExpr(True)
     
-    return BaseAST('PARAM', [], varType)
+    return BaseAST('PARAM', varType)
     
   def loadGenTypeDecl(self):
     # GEN_TYPE_DECL = LT GENERIC_TYPE (COMMA GENERIC_TYPE)* GT
@@ -1060,7 +1215,7 @@ class SyntaxParser(object):
     
     # Load generic type name
     genDict['name'] = self.getToken()
-    self.verify(['ID','SELFTYPE'])
+    self.verify(self.idTypeKinds)
     
     # Are there type bounds?
     if (self.check('LPAREN')):
@@ -1076,7 +1231,7 @@ class SyntaxParser(object):
       genDict['defaultType'] = None
       
     #Create module node
-    return BaseAST('GENTYPE', [], genDict)
+    return BaseAST('GENTYPE', genDict)
     
   def loadTypeBound(self):
     # TYPE_BOUNDS = LPAREN ID (ADD_OPER ID)* RPAREN
@@ -1133,7 +1288,7 @@ class SyntaxParser(object):
       
     varType['dim'] = dim
     
-    return BaseAST('TYPE', [], varType)
+    return BaseAST('TYPE', varType)
       
   def loadModuleDecl(self):
     # Read module line (MODULE ID GEN_TYPE_DECL? (LPAREN BLACKBOX RPAREN)? COLON)
@@ -1178,7 +1333,7 @@ class SyntaxParser(object):
     self.rmScope()
     
     #Create module node
-    return BaseAST(base, comment, modDict)
+    return self.createNode(base, comment, modDict)
     
   def loadGenericDecl(self):
     # Load line (GENERICS COLON)
@@ -1266,7 +1421,7 @@ class SyntaxParser(object):
     #Return to original scope
     self.rmScope()
     
-    return BaseAST(base, comment, archDict)
+    return self.createNode(base, comment, archDict)
     
   def loadLogicStatements(self, logicType):
     # Load logic statements
@@ -1275,87 +1430,53 @@ class SyntaxParser(object):
     #   Task statements: (ASSIGNMENT|METHOD_TASK_CALL|FOR|CASE|IF|MODULE_INST|SPRO|APRO|PRO|ASSERTION|RETURN|ATTR)
     #   Proc statements: (ASSIGNMENT|METHOD_TASK_CALL|FOR|CASE|IF|ASSERTION|REPORT)
     statementNodes = []
+    dropped = False
     
     # All statements
-    tokenList = ['ID', 'FOR', 'IF', 'CASE', 'SPRO', 'APRO', 'PRO', 'ASSERT', 'REPORT', 'RENAME', 'LPAREN', 'SELFVALUE', 'ATTR', 'RETURN']
-    while (self.check(tokenList,True)):
+    while (self.check(self.statementKinds,True)):
       # Load all statements
-      statementNodes.append(self.loadStatement(logicType))
+      node = self.tryLoad(self.loadStatement, logicType)
+      if node is not None:
+        statementNodes.append(node)
+      else:
+        dropped = True
+    
+    # Block left empty by recovered errors is not reported again
+    if (dropped and not statementNodes):
+      raise ParseError([])
     
     return statementNodes
     
   def loadStatement(self, logicType):
-    # Allowed statements:
-    if (self.check('SPRO')):
-      # Error checking
-      if (logicType in [LogicEnum.func, LogicEnum.proc]):
-        self.error(errorStr='Detected a synchronous process, not allowed in this contexted')
-      return self.loadSpro()
-      
-    elif (self.check('APRO')):
-      if (logicType in [LogicEnum.func, LogicEnum.proc]):
-        self.error(errorStr='Detected an asynchronous process, not allowed in this contexted')
-      return self.loadApro()
-      
-    elif (self.check('PRO')):
+    # Allowed statements, dispatched on leading token
+    tokenKind = self.token.kind
+    if (tokenKind in self.statementRestrict):
+      (notAllowed, errorStr) = self.statementRestrict[tokenKind]
+      if (logicType in notAllowed):
+        self.error(errorStr=errorStr)
+    
+    if (tokenKind in self.statementLoaders):
+      return self.statementLoaders[tokenKind](self, logicType)
+    else:
+      print('Type {0} not parsed.'.format(self.getType()))
+      self.error()
+  
+  def loadIdStatement(self, logicType):
+    # If ID, determine if its a module inst., var declaration, or assignment
+    type = self.determineStatement()
+    if (type == 'MODULE'):
       if (logicType in [LogicEnum.func, LogicEnum.proc]):
-        self.error(errorStr='Detected a user-defined process, not allowed in this contexted')
-      return self.loadPro()
-      
-    elif (self.check('FOR')):
-      return self.loadFor(logicType)
-      
-    elif (self.check('IF')):
-      return self.loadIf(logicType)
-      
-    elif (self.check('CASE')):
-      return self.loadCase(logicType)
-      
-    elif (self.check('RENAME')):
-      if (logicType in [LogicEnum.func, LogicEnum.proc, LogicEnum.task]):
         self.error(errorStr='Detected a rename statement, not allowed in this contexted')
-      return self.loadRename()
-      
-    elif (self.check('ASSERT')):
-      return self.loadAssert()
+      return self.loadModuleInst()
       
-    elif (self.check('REPORT')):
-      if (logicType in [LogicEnum.arch, LogicEnum.task]):
-        self.error(errorStr='Detected a report statement, not allowed in this contexted')
-      return self.loadReport()
+    elif (type == 'METHOD_TASK'):
+      return self.loadVarDecl('signal')
       
-    elif (self.check('RETURN')):
-      if (logicType in [LogicEnum.arch, LogicEnum.proc]):
-        self.error(errorStr='Detected a report statement, not allowed in this contexted')
-      return self.loadReturn()
-      
-    elif (self.check('ATTR')):
-      if (logicType in [LogicEnum.proc]):
-        self.error(errorStr='Detected an attribute statement, not allowed in this contexted')
-      return self.loadAttrDecl()
-      
-    elif (self.check('LPAREN')):
+    elif (type == 'ASSIGNMENT'):
       return self.loadAssignment()
       
-    elif (self.check(['ID', 'SELFVALUE'])):
-      # If ID, determine if its a module inst., var declaration, or assignment
-      type = self.determineStatement()
-      if (type == 'MODULE'):
-        if (logicType in [LogicEnum.func, LogicEnum.proc]):
-          self.error(errorStr='Detected a rename statement, not allowed in this contexted')
-        return self.loadModuleInst()
-        
-      elif (type == 'METHOD_TASK'):
-        return self.loadVarDecl('signal')
-        
-      elif (type == 'ASSIGNMENT'):
-        return self.loadAssignment()
-        
-      else:
-        print('Type {0} not parsed.'.format(type))
-        self.error()
     else:
-      print('Type {0} not parsed.'.format(self.getType()))
+      print('Type {0} not parsed.'.format(type))
       self.error()
       
   def determineStatement(self):
@@ -1365,23 +1486,21 @@ class SyntaxParser(object):
     # FUNC_METHOD_CALL = ID (INDEX_LIST)? (DOT ID (INDEX_LIST)?)* (DOT FUNC_CALL)
     # ASSIGNMENT = (VAR | TUPLE_EXPR) ASSIGN_OPTIONS CMPX_EXPR
     
-    ind = 0
     token1 = self.token
-    token2 = self.peek(ind)
+    token2 = self.peek(0)
     
-    asgnList = ['ASSIGN', 'CMPD_ARITH_ASSIGN', 'CMPD_LOGICAL_ASSIGN', 'POST_OPER']
+    idKind  = self.kindIds['ID']
     
     # See what next ID is
-    if ((token1.type == 'ID') and (token2.type == 'ID')):
+    if ((token1.kind == idKind) and (token2.kind == idKind)):
       # Both ID, its a module
       return 'MODULE'
 
     else:
-      # Check entire line until EOL to check for assignments
-      while (self.peek(ind).type is not 'EOL'):
-        if (self.peek(ind).type in asgnList):
-          return 'ASSIGNMENT'
-        ind += 1
+      # Lexer records last assignment of each line, see if it follows token1
+      (eolInd, asgnInd) = self.lexer.getLineFacts(token1)
+      if (asgnInd > token1.ind):
+        return 'ASSIGNMENT'
           
       # No assignment, so its a task or method call
       return 'METHOD_TASK'
@@ -1401,11 +1520,11 @@ class SyntaxParser(object):
     
     # Make sure there were statements found
     if (not sproDict['statements']):
-      raise Exception('Spro: No statements defined')
+      self.error(errorStr='Spro: No statements defined')
     
     self.rmScope()
     
-    return BaseAST(base, comment, sproDict)
+    return self.createNode(base, comment, sproDict)
     
   def loadApro(self):
     # Load line (APRO ARG_LIST COLON)
@@ -1422,11 +1541,11 @@ class SyntaxParser(object):
     
     # Make sure there were statements found
     if (not aproDict['statements']):
-      raise Exception('Apro: No statements defined')
+      self.error(errorStr='Apro: No statements defined')
     
     self.rmScope()
     
-    return BaseAST(base, comment, aproDict)
+    return self.createNode(base, comment, aproDict)
     
   def loadPro(self):
     # Load line (PRO ARG_LIST COLON)
@@ -1443,11 +1562,11 @@ class SyntaxParser(object):
     
     # Make sure there were statements found
     if (not proDict['statements']):
-      raise Exception('Pro: No statements defined')
+      self.error(errorStr='Pro: No statements defined')
     
     self.rmScope()
     
-    return BaseAST(base, comment, proDict)
+    return self.createNode(base, comment, proDict)
     
   def loadFor(self, logicType):
     # Load line (FOR ID IN (RANGE_EXPR|VAR) COLON)
@@ -1468,11 +1587,11 @@ class SyntaxParser(object):
       
     # Make sure there were statements found
     if (not forDict['statements']):
-      raise Exception('For: No statements defined')
+      self.error(errorStr='For: No statements defined')
       
     self.rmScope()
     
-    return BaseAST(base, comment, forDict)
+    return self.createNode(base, comment, forDict)
     
   def loadIf(self, logicType):
     # Load line (IF LPAREN SIMP_EXPR RPAREN COLON)
@@ -1491,7 +1610,7 @@ class SyntaxParser(object):
       
     # Make sure there were statements found
     if (not ifDict['statements']):
-      raise Exception('If: No statements defined')
+      self.error(errorStr='If: No statements defined')
       
     self.rmScope()
     
@@ -1506,7 +1625,7 @@ class SyntaxParser(object):
     if (self.check('ELSE')):
       ifDict['else'].append(self.loadElse(logicType))
     
-    return BaseAST(base, comment, ifDict)
+    return self.createNode(base, comment, ifDict)
     
   def loadElif(self, logicType):
     # Load line (ELIF LPAREN SIMP_EXPR RPAREN COLON)
@@ -1525,11 +1644,11 @@ class SyntaxParser(object):
       
     # Make sure there were statements found
     if (not elifDict['statements']):
-      raise Exception('Elif: No statements defined')
+      self.error(errorStr='Elif: No statements defined')
       
     self.rmScope()
     
-    return BaseAST(base, comment, elifDict)
+    return self.createNode(base, comment, elifDict)
     
   def loadElse(self, logicType):
     # Load line (ELSE COLON)
@@ -1545,11 +1664,11 @@ class SyntaxParser(object):
       
     # Make sure there were statements found
     if (not elseDict['statements']):
-      raise Exception('Else: No statements defined')
+      self.error(errorStr='Else: No statements defined')
       
     self.rmScope()
     
-    return BaseAST(base, comment, elseDict)
+    return self.createNode(base, comment, elseDict)
     
   def loadCase(self, logicType):
     # Load line (CASE LPAREN SIMP_EXPR RPAREN COLON)
@@ -1570,12 +1689,12 @@ class SyntaxParser(object):
       
     # Make sure there were statements found
     if (not caseChoices):
-      raise Exception('Case: No choices defined')
+      self.error(errorStr='Case: No choices defined')
       
     caseDict['choices'] = caseChoices
     self.rmScope()
     
-    return BaseAST(base, comment, caseDict)
+    return self.createNode(base, comment, caseDict)
     
   def loadCaseChoice(self, logicType):
     # Load line (CHOICE COLON)
@@ -1591,11 +1710,11 @@ class SyntaxParser(object):
       
     # Make sure there were statements found
     if (not caseDict['statements']):
-      raise Exception('Case Choice: No statements defined')
+      self.error(errorStr='Case Choice: No statements defined')
       
     self.rmScope()
       
-    return BaseAST('CHOICE', comments, caseDict)
+    return self.createNode('CHOICE', comments, caseDict)
       
   def loadAssignment(self):
     # Load line ((VAR | TUPLE_EXPR) ASSIGN_OPTIONS CMPX_EXPR)
@@ -1607,10 +1726,9 @@ class SyntaxParser(object):
       asgnDict['leftVar'] = self.loadVar(False)
       
     # Determine assignment type
-    asgnList = ['ASSIGN', 'CMPD_ARITH_ASSIGN', 'CMPD_LOGICAL_ASSIGN', 'POST_OPER']
     asgnDict['op'] = self.getToken()
     operType = self.getType()
-    self.verify(asgnList)
+    self.verify(self.asgnKinds)
     
     # See if POST_OPER
     if (operType != 'POST_OPER'):
@@ -1620,7 +1738,7 @@ class SyntaxParser(object):
       asgnDict['rightExpr'] = baseInd
       
     comment = self.skip()
-    return BaseAST(operType, comment, asgnDict)
+    return self.createNode(operType, comment, asgnDict)
     
   def loadModuleInst(self):
     # Load line (ID BASE_NAME GEN_TYPE_CALL? (LPAREN (ID | BLACKBOX) RPAREN)? COLON)
@@ -1641,7 +1759,7 @@ class SyntaxParser(object):
     if (self.check('LPAREN')):
       self.verify('LPAREN')
       modDict['arch'] = self.getToken()
-      self.verify(['ID','BLACKBOX'])
+      self.verify(self.archNameKinds)
       self.verify('RPAREN')
     else:
       modDict['arch'] = None
@@ -1660,7 +1778,7 @@ class SyntaxParser(object):
     
     self.rmScope()
     
-    return BaseAST(base, comment, modDict)
+    return self.createNode(base, comment, modDict)
     
   def loadGenericInst(self):
     # Load line (GENERICS COLON)
@@ -1679,7 +1797,7 @@ class SyntaxParser(object):
       
     # Make sure there were statements found
     if (not genVars):
-      raise Exception('Generic Inst: No statements defined')
+      self.error(errorStr='Generic Inst: No statements defined')
       
     #Return to original scope
     self.rmScope()
@@ -1695,7 +1813,7 @@ class SyntaxParser(object):
     varDict['var'] = self.loadComplexExpr(False)
       
     comment = self.skip()
-    return BaseAST('GEN_ASSIGN', comment, varDict)
+    return self.createNode('GEN_ASSIGN', comment, varDict)
     
   def loadPortInst(self):
     # Load line (PORTS COLON)
@@ -1714,7 +1832,7 @@ class SyntaxParser(object):
       
     # Make sure there were statements found
     if (not portVars):
-      raise Exception('Post Inst: No statements defined')
+      self.error(errorStr='Post Inst: No statements defined')
       
     #Return to original scope
     self.rmScope()
@@ -1729,7 +1847,7 @@ class SyntaxParser(object):
     varDict['var'] = self.loadComplexExpr(False)
       
     comment = self.skip()
-    return BaseAST('PORT_ASSIGN', comment, varDict)
+    return self.createNode('PORT_ASSIGN', comment, varDict)
     
   def loadReturn(self):
     # Load line (RETURN (SIMP_EXPR|(LPAREN SIMP_EXPR (COMMA SIMP_EXPR)* RPAREN)))
@@ -1751,7 +1869,7 @@ class SyntaxParser(object):
     returnDict = {'vars': vars}
     comment = self.skip()
     
-    return BaseAST('RETURN', comment, returnDict)
+    return self.createNode('RETURN', comment, returnDict)
     
   def loadRename(self):
     # Load line (RENAME VAR ASSIGN SIMP_EXPR)
@@ -1765,7 +1883,7 @@ class SyntaxParser(object):
     # Line is complete
     comment = self.skip()
     
-    return BaseAST(base, comment, renameDict)
+    return self.createNode(base, comment, renameDict)
     
     
   def loadAssert(self):
@@ -1784,13 +1902,13 @@ class SyntaxParser(object):
     assertDict['status'] = self.loadReport()
     self.rmScope()
     
-    return BaseAST(base, comment, assertDict)
+    return self.createNode(base, comment, assertDict)
     
   def loadReport(self):
     # Load line ((PRINT|WARNING|ERROR) LPAREN CONST RPAREN)
     base = self.getType()
     reportDict = {}
-    self.verify(['PRINT', 'WARNING', 'ERROR'], True)
+    self.verify(self.reportKinds, True)
     self.verify('LPAREN')
     reportDict['str'] = self.loadSimpleExpr(True)
     self.verify('RPAREN')
@@ -1798,7 +1916,7 @@ class SyntaxParser(object):
     # Line is complete
     comment = self.skip()
     
-    return BaseAST(base, comment, reportDict)
+    return self.createNode(base, comment, reportDict)
     
   # isDecl specifies if this is a declaration call or assignment call
   # this variable will be passed to semantic analyzer to verify
@@ -1813,6 +1931,11 @@ class SyntaxParser(object):
     
   def loadAggregate(self,isDecl):
     # Load line (LBRACK ELEM_ASSOC (COMMA ELEM_ASSOC)* RBRACK)
+    # Aggregates of plain numbers, like ROM tables, are loaded in bulk
+    node = self.loadConstAggregate(isDecl)
+    if node is not None:
+      return node
+    
     comments = []
     self.verify('LBRACK')
     comments += self.skip()
@@ -1828,7 +1951,76 @@ class SyntaxParser(object):
     aggDict = dict()
     aggDict['elem'] = elem
     
-    return BaseAST('AGGREGATE', comments, aggDict)
+    return self.createNode('AGGREGATE', comments, aggDict)
+  
+  def loadConstAggregate(self, isDecl):
+    # Scan ahead for (LBRACK NUM (COMMA NUM)* RBRACK), NUM = (SIGN)? (INTEGER | FLOAT)
+    # with one number kind. Returns None without consuming tokens when the
+    # aggregate is anything else, it is then loaded element by element.
+    values   = []
+    comments = []
+    numKinds = set()
+    needNum  = True
+    ind = 0
+    while True:
+      token = self.peek(ind)
+      ind += 1
+      
+      # EOL and comments can follow LBRACK, COMMA and elements after the first
+      if (token.kind in self.skipKinds):
+        if (not needNum and (len(values) == 1)):
+          return None
+        if (self.keepComments and (token.kind in self.commentKinds)):
+          comments.append(token)
+        continue
+      
+      if (needNum):
+        sign = 1
+        if (token.kind in self.signKinds):
+          if (token.kind == self.kindIds['SUB_OPER']):
+            sign = -1
+          token = self.peek(ind)
+          ind += 1
+        
+        if (token.kind not in self.numberKinds):
+          return None
+        numKinds.add(token.kind)
+        values.append(sign*int(token.value) if (token.kind == self.kindIds['INTEGER']) else sign*float(token.value))
+        needNum = False
+      elif (token.kind == self.kindIds['COMMA']):
+        needNum = True
+      elif (token.kind == self.kindIds['RBRACK']):
+        break
+      else:
+        return None
+    
+    # Element type is taken from all elements, mixed kinds and integers
+    # outside int64 are left to the element by element path
+    constDict = dict()
+    if (numKinds == {self.kindIds['INTEGER']}):
+      if ((min(values) < -2**63) or (max(values) >= 2**63)):
+        return None
+      constDict['value']    = np.array(values, dtype=np.int64)
+      constDict['typeName'] = BaseAST('TYPE', {'name': ['sint']})
+      constDict['params']   = [determineBits(max(abs(x) for x in values))]
+    elif (numKinds == {self.kindIds['FLOAT']}):
+      constDict['value']    = np.array(values, dtype=np.float64)
+      constDict['typeName'] = BaseAST('TYPE', {'name': ['float']})
+      constDict['params']   = []
+    else:
+      return None
+    
+    # Consume up to RBRACK
+    for _ in range(ind):
+      self.next()
+    self.verify('RBRACK')
+    
+    constDict['name']  = 'const'
+    constDict['const'] = True
+    constDict['port']  = None
+    constDict['decl']  = isDecl
+    
+    return self.createNode('CONST_ARRAY', comments, constDict)
     
   def loadElemAssoc(self,isDecl):
     # Load ((CHOICES ASSIGN)? (AGGREGATE|SIMP_EXPR))
@@ -1838,7 +2030,7 @@ class SyntaxParser(object):
     if (self.check('LBRACK')):
       elemDict['left'] = None
       elemDict['right'] = self.loadAggregate(isDecl)
-      return BaseAST('ELEM', [], elemDict)
+      return BaseAST('ELEM', elemDict)
     
     # At this point, not sure if its choice or value
     values = self.loadChoices(isDecl)
@@ -1857,7 +2049,7 @@ class SyntaxParser(object):
       elemDict['left'] = None
       elemDict['right'] = values
     
-    return BaseAST('ELEM', [], elemDict)
+    return BaseAST('ELEM', elemDict)
     
   def loadChoices(self,isDecl):
     # Load CHOICE (OR_BAR CHOICE)*
@@ -1874,7 +2066,7 @@ class SyntaxParser(object):
   def loadChoice(self,isDecl):
     # Load (SLICE | OTHERS)
     if (self.check('OTHERS')):
-      arg = BaseAST('OTHERS', [], dict())
+      arg = BaseAST('OTHERS', dict())
       self.verify('OTHERS')
     else:
       arg = self.loadIndex(isDecl)
@@ -1883,16 +2075,11 @@ class SyntaxParser(object):
     
   def loadSimpleExpr(self,isDecl):
     # Load (RELATION (LOGICAL_OPER RELATION)*)
-    node = self.loadRelation(isDecl)
-    
-    oper = ['LOGICAL_OPER']
-    while (self.check(oper)):
-      # Create new expr node
-      exprDict = dict()
-      exprDict['op']   = self.getToken()
-      self.verify(oper)
-      exprDict['params'] = [node, self.loadRelation(isDecl)]
-      node = BaseAST('EXPR', [], exprDict)
+    #   RELATION = TERM ((RELATION_OPER | GT | LT) TERM)*
+    #   TERM     = FACT ((ADD_OPER | SUB_OPER | CAT) FACT)*
+    #   FACT     = EXPONENT ((STAR | DIV | MOD_REM_OPER) EXPONENT)*
+    #   EXPONENT = UNARY (EXP UNARY)*
+    node = self.loadBinaryExpr(isDecl, 1)
       
     # See if units are defined
     node.units = None
@@ -1903,67 +2090,22 @@ class SyntaxParser(object):
       
     return node
   
-  def loadRelation(self,isDecl):
-    # Load (TERM (RELATION_OPER TERM)*)
-    node = self.loadTerm(isDecl)
-    
-    oper = ['RELATION_OPER', 'GT', 'LT']
-    while (self.check(oper)):
-      # Create new expr node
-      exprDict = dict()
-      exprDict['op']   = self.getToken()
-      self.verify(oper)
-      exprDict['params'] = [node, self.loadTerm(isDecl)]
-      node = BaseAST('EXPR', [], exprDict)
-      
-    return node
-    
-  def loadTerm(self,isDecl):
-    # Load (FACT ((ADD_OPER | SUB_OPER | CAT) FACT)*)
-    node = self.loadFactor(isDecl)
-    
-    oper = ['ADD_OPER', 'SUB_OPER', 'CAT']
-    while (self.check(oper)):
-      # Create new expr node
-      exprDict = dict()
-      exprDict['op']   = self.getToken()
-      if (self.getType() == 'CAT'):
-        op = 'CAT'
-      else:
-        op = 'EXPR'
-      self.verify(oper)
-      exprDict['params'] = [node, self.loadFactor(isDecl)]
-      node = BaseAST(op, [], exprDict)
-      
-    return node
-    
-  def loadFactor(self,isDecl):
-    # Load (EXPONENT ((STAR | DIV | MOD_REM_OPER) EXPONENT)*)
-    node = self.loadExponent(isDecl)
-    
-    oper = ['STAR','DIV','MOD_REM_OPER']
-    while (self.check(oper)):
-      # Create new expr node
-      exprDict = dict()
-      exprDict['op']   = self.getToken()
-      self.verify(oper)
-      exprDict['params'] = [node, self.loadExponent(isDecl)]
-      node = BaseAST('EXPR', [], exprDict)
-      
-    return node
-    
-  def loadExponent(self,isDecl):
-    # Load (UNARY (EXP UNARY)*)
+  def loadBinaryExpr(self, isDecl, minPrec):
+    # Precedence climbing over binaryOps, loads operators binding at
+    # least as tight as minPrec
     node = self.loadUnary(isDecl)
     
-    oper = ['EXP_OPER']
-    while (self.check(oper)):
+    while (self.token.kind in self.binaryOps):
+      (prec, op) = self.binaryOps[self.token.kind]
+      if (prec < minPrec):
+        break
+      
       # Create new expr node
       exprDict = dict()
       exprDict['op']   = self.getToken()
-      self.verify(oper)
-      exprDict['params'] = [node, self.loadUnary(isDecl)]
-      node = BaseAST('EXPR', [], exprDict)
+      self.next()
+      exprDict['params'] = [node, self.loadBinaryExpr(isDecl, prec+1)]
+      node = BaseAST(op, exprDict)
       
     return node
     
@@ -1971,14 +2113,14 @@ class SyntaxParser(object):
     # Load ((ADD_OPER | SUB_OPER | NOT_OPER)? PRIMARY)
     exprDict = dict()
     
-    oper = ['ADD_OPER', 'SUB_OPER', 'NOT_OPER']
+    oper = self.unaryOpKinds
     if (self.check(oper)):
       # Create new expr node
       exprDict = dict()
       exprDict['op']   = self.getToken()
       self.verify(oper)
       exprDict['params'] = [self.loadPrimary(isDecl)]
-      node = BaseAST('EXPR', [], exprDict)
+      node = BaseAST('EXPR', exprDict)
     else:
       node = self.loadPrimary(isDecl)
       
@@ -1986,8 +2128,8 @@ class SyntaxParser(object):
     
   def loadPrimary(self,isDecl):
     # Load (CONST | REPLICATE | (LPAREN SIMP_EXPR RPAREN) | FUNC | VAR)
-    constList = ['INTEGER', 'FLOAT', 'BIT_INIT_HEX', 'BIT_INIT_BIN', 'STRING', 'BOOLEAN']
-    funcList  = ['ID', 'LOGICAL_OPER', 'MOD_REM_OPER', 'NOT_OPER']
+    constList = self.constKinds
+    funcList  = self.funcKinds
     if (self.check(constList)):
       return self.loadConst(isDecl)
       
@@ -1999,7 +2141,7 @@ class SyntaxParser(object):
       
     elif (self.check(funcList)):
       # We dont know if it is function or variable
-      if (self.peek().type in ['LPAREN','LT']):
+      if (self.peek().kind in self.callKinds):
         return self.loadFuncCall(isDecl, False)
       else:
         return self.loadVar(isDecl)
@@ -2012,7 +2154,7 @@ class SyntaxParser(object):
     
   def loadFuncCall(self, isDecl, isMethod):
     # Load (FUNC_NAME GEN_TYPE_CALL? CALL_ARG_LIST)
-    funcList  = ['ID', 'LOGICAL_OPER', 'MOD_REM_OPER', 'NOT_OPER']
+    funcList  = self.funcKinds
     funcDict = {'name': self.getToken()}
     self.verify(funcList)
     
@@ -2026,11 +2168,11 @@ class SyntaxParser(object):
     funcDict['params'] = self.loadCallArgList(isDecl)
     funcDict['method'] = isMethod
     
-    return BaseAST('FUNCCALL', [], funcDict)
+    return BaseAST('FUNCCALL', funcDict)
       
   def loadConst(self, isDecl):
     # CONST = (INTEGER | FLOAT | BIT_INIT_HEX | BIT_INIT_BIN | STRING | BOOLEAN)
-    constList = ['INTEGER', 'FLOAT', 'BIT_INIT_HEX', 'BIT_INIT_BIN', 'STRING', 'BOOLEAN']
+    constList = self.constKinds
     
     numDict = dict()
     typeStr = self.getType()
@@ -2040,34 +2182,35 @@ class SyntaxParser(object):
     # Convert value
     if (typeStr == 'INTEGER'):
       value = int(valStr)
-      numDict['typeName'] = BaseAST('TYPE', [], {'name': ['sint']})
+      numDict['typeName'] = BaseAST('TYPE', {'name': ['sint']})
       numDict['params'] = [determineBits(value)]
       numDict['value']  = value
     elif (typeStr == 'FLOAT'):
-      numDict['typeName']  = BaseAST('TYPE', [], {'name': ['float']})
+      numDict['typeName']  = BaseAST('TYPE', {'name': ['float']})
       numDict['params'] = []
       numDict['value'] = float(valStr)
     elif (typeStr == 'BIT_INIT_BIN'):
       #numDict['typeName'] = 'bit'
       #numDict['params'] = []
-      binData = re.match('[b]?\'([01ZXLH-]+)\'',valStr).group(1)
+      binData = re.match('[b]?\'([01ZXLH_-]+)\'',valStr).group(1)
+      if not binData.strip('_'):
+        self.error(errorStr='Bit literal has no bits')
       self.verify(constList)
-      return createBitArray(binData)
+      return createBitArray(numDict['token'], binData)
       #numDict['value'] = list(binData)
     elif (typeStr == 'BIT_INIT_HEX'):
       #numDict['typeName'] = 'bit'
       #numDict['params'] = []
       hexData = re.match('x\'([0-9a-fA-F]+)\'',valStr).group(1)
-      binData = bin(int(hexData, 16))[2:].zfill(4*len(hexData))
       self.verify(constList)
-      return createBitArray(binData)
+      return createBitArray(numDict['token'], int(hexData, 16), 4*len(hexData))
       #numDict['value'] = list(binData)
     elif (typeStr == 'STRING'):
-      numDict['typeName']  = BaseAST('TYPE', [], {'name': ['str']})
+      numDict['typeName']  = BaseAST('TYPE', {'name': ['str']})
       numDict['params'] = []
       numDict['value'] = valStr.replace('"','')
     elif (typeStr == 'BOOLEAN'):
-      numDict['typeName']  = BaseAST('TYPE', [], {'name': ['bool']})
+      numDict['typeName']  = BaseAST('TYPE', {'name': ['bool']})
       numDict['params'] = []
       numDict['value'] = valStr
     
@@ -2077,15 +2220,13 @@ class SyntaxParser(object):
     numDict['decl']  = isDecl
     self.verify(constList)
     
-    return BaseAST('CONST', [], numDict)
+    return BaseAST('CONST', numDict)
     
   def loadVar(self, isDecl, includeSelf=False):
     #Load (ID (INDEX_LIST)? (DOT VAR)? ) 
     varDict = dict()
     varDict['name'] = self.getToken()
-    tokenList = ['ID']
-    if (includeSelf):
-      tokenList.append('SELFVALUE')
+    tokenList = self.idValueKinds if includeSelf else self.idKinds
     self.verify(tokenList)
     
     varDict['decl'] = isDecl
@@ -2097,10 +2238,10 @@ class SyntaxParser(object):
       varDict['array'] = None
       
     # check for struct or interface variable
-    funcList  = ['ID', 'LOGICAL_OPER', 'MOD_REM_OPER', 'NOT_OPER']
+    funcList  = self.funcKinds
     if (self.check('DOT')):
       self.verify('DOT')
-      if (self.check(funcList) and (self.peek().type in ['LPAREN','LT'])):
+      if (self.check(funcList) and (self.peek().kind in self.callKinds)):
         # Load method
         varDict['field'] = None
         varDict['method']  = self.loadFuncCall(isDecl, True)
@@ -2113,7 +2254,7 @@ class SyntaxParser(object):
       varDict['field'] = None
       varDict['method']  = None
       
-    return BaseAST('VAR', [], varDict)
+    return BaseAST('VAR', varDict)
     
   def loadIndexList(self, isDecl):
     # Load line (LBRACK INDEX RBRACK)*
@@ -2156,5 +2297,5 @@ class SyntaxParser(object):
     elif (self.check('SELFTYPE')):
       self.verify('SELFTYPE')
       
-    return BaseAST(baseName, [], genType)
+    return BaseAST(baseName, genType)
       
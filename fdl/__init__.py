@@ -1,3 +1,9 @@
+from Grammar import Grammar
 from Lexer import Lexer
+from Lexer import IncrementalLexer
+from ASTSchema import BaseAST
 from SyntaxParser import SyntaxParser
+from SyntaxParser import ParseError
+from IncrementalParser import IncrementalParser
+from ParallelParser import ParallelParser
 from SemanticAnalyzer import SemanticAnalyzer
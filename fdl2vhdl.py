@@ -6,7 +6,6 @@ fdlPath = sys.path[0]
 sys.path.append(fdlPath + ('/fdl/'))
 
 import fdl
-import yaml
 
 # Display Pythonista console better
 try:
@@ -16,12 +15,8 @@ except ImportError:
   pass
 
 def main(project_files, project_path):
-  #Load Lexer Configuration
-  fo = open('builtin/test.yaml')
-  #print(fo.read())
-  gramConfig = yaml.load(fo.read())
-  fo.close()
-  print(gramConfig)
+  #Load Lexer Configuration, compiled grammar is cached by YAML hash
+  gramConfig = fdl.Grammar.load('builtin/grammer-fdl.yaml')
   
   #FDL source files
   fdl_filename_list = [
@@ -35,31 +30,21 @@ def main(project_files, project_path):
   # FDL standard library path
   fdl_stdlib_path = ['builtin/']
   
-  #Initialize Lexer/SyntaxParser
-  lexer   = fdl.Lexer(gramConfig)
-  parser  = fdl.SyntaxParser(lexer)
-  
   # Build Semantic Analyzer and Symbol Table
   semAnalyzer = fdl.SemanticAnalyzer(gramConfig, fdl_stdlib_path)
   semAnalyzer.addPath(project_path)
-                       
-  # Build AST
-  astList = []
-  for (fdl_filename, importName) in fdl_filename_list:
-    #Read FDL file
-    fo = open(fdl_filename)
-    fdlStr = fo.read()
-    fo.close()
-    
-    # Append AST
-    ast = parser.parse(fdlStr, fdl_filename, importName)
-    
-    #print('\n'.join(ast.log()))
   
-    # Check semantics
-    addedFiles = semAnalyzer.pre_process(ast)
-    fdl_filename_list.extend(addedFiles)
-    
+  # Build AST, files are parsed on a process pool and imports are
+  # added to fdl_filename_list as they are found. All syntax errors
+  # of a file are reported together.
+  parser  = fdl.ParallelParser(gramConfig, '.fdlcache', recover=True)
+  try:
+    astList = parser.parse(fdl_filename_list, semAnalyzer)
+  except fdl.ParseError as e:
+    for diag in e.diagnostics:
+      print(diag)
+    sys.exit(1)
+  
   # Now process AST
   semAnalyzer.process()
   
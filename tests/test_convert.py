@@ -0,0 +1,59 @@
+#VHDL output of constant nodes.
+#Run with: python -m unittest discover tests
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'fdl'))
+
+from Lexer import Lexer
+from SyntaxParser import SyntaxParser
+from Convert import Convert
+
+GRAMMAR_FILE = os.path.join(ROOT, 'builtin', 'grammer-fdl.yaml')
+
+def loadGrammar():
+  fo = open(GRAMMAR_FILE, 'r')
+  config = yaml.safe_load(fo)
+  fo.close()
+  return config
+
+class TestConstArray(unittest.TestCase):
+  @classmethod
+  def setUpClass(cls):
+    cls.grammar = loadGrammar()
+  
+  def setUp(self):
+    self.outDir = tempfile.TemporaryDirectory()
+    config = {'fdlHeader': '', 'vhdlHeader': ''}
+    self.convert = Convert(os.path.join(self.outDir.name, 't.vhd'), config)
+  
+  def tearDown(self):
+    self.convert.fid.close()
+    self.outDir.cleanup()
+  
+  def convertValue(self, declStr):
+    # Parse a single declaration in a library, return VHDL of its value
+    text = 'library t:\n  {0}\n'.format(declStr)
+    with contextlib.redirect_stdout(io.StringIO()):
+      fileNode = SyntaxParser(Lexer(self.grammar)).parse(text, 't.fdl', None)
+    value = fileNode.nodes[0].nodes[0].value
+    self.assertEqual(value.base, 'CONST_ARRAY')
+    return self.convert.visit(value)
+  
+  def test_positional(self):
+    self.assertEqual(self.convertValue('sint[3] c = [1, -2, 3]'), '(1, -2, 3)')
+    self.assertEqual(self.convertValue('float[2] c = [0.5, 1.5]'), '(0.5, 1.5)')
+  
+  def test_single_element(self):
+    # (5) is not an aggregate in VHDL
+    self.assertEqual(self.convertValue('sint[1] c = [5]'), '(0 => 5)')
+    self.assertEqual(self.convertValue('float[1] c = [-2.5]'), '(0 => -2.5)')
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,104 @@
+#Incremental lexer must produce the same tokens, at the same positions,
+#as the full lexer, both for a fresh text and after edits.
+#Run with: python -m unittest discover tests
+import glob
+import os
+import sys
+import unittest
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'fdl'))
+
+from Lexer import Lexer, IncrementalLexer
+
+GRAMMAR_FILE = os.path.join(ROOT, 'builtin', 'grammer-fdl.yaml')
+
+FILES = sorted(glob.glob(os.path.join(ROOT, 'examples', '*.fdl')) +
+               glob.glob(os.path.join(ROOT, 'builtin', '**', '*.fdl'), recursive=True))
+
+# (firstLine, lastLine, text) edits applied in order to the source
+EDITS = [
+  (1, 1, '# header\n'),
+  (3, 4, ''),
+  (2, 2, '  indented = 1\n\n'),
+  (4, 5, 'a = "x" # y\n'),
+  (1, 2, 'b'),
+]
+
+def loadGrammar():
+  fo = open(GRAMMAR_FILE, 'r')
+  config = yaml.safe_load(fo)
+  fo.close()
+  return config
+
+def readFile(filename):
+  fo = open(filename, 'r')
+  text = fo.read()
+  fo.close()
+  return text
+
+def lexTokens(lexer):
+  # (type, value, scope, lineNo, charNo) of all tokens up to EOF
+  tokens = []
+  while True:
+    token = lexer.get()
+    tokens.append((token.type, token.value, token.scope, token.lineNo, token.charNo))
+    if (token.type == 'EOF'):
+      return tokens
+
+def applyEdit(text, firstLine, lastLine, newText):
+  # Same line range semantics as IncrementalLexer.edit
+  lines = text.split('\n')
+  start = sum(len(line)+1 for line in lines[0:firstLine-1])
+  if (lastLine-1 >= len(lines)):
+    end = len(text)
+  else:
+    end = sum(len(line)+1 for line in lines[0:lastLine-1])
+  return text[0:start] + newText + text[end:]
+
+class TestIncrementalLexer(unittest.TestCase):
+  @classmethod
+  def setUpClass(cls):
+    cls.grammar = loadGrammar()
+  
+  def fullTokens(self, text):
+    lexer = Lexer(self.grammar)
+    lexer.convert(text)
+    return lexTokens(lexer)
+  
+  def assertSameTokens(self, incTokens, fullTokens):
+    # EOL positions are checked separately for a readable failure
+    incEols  = [token[3:5] for token in incTokens if (token[0] == 'EOL')]
+    fullEols = [token[3:5] for token in fullTokens if (token[0] == 'EOL')]
+    self.assertEqual(incEols, fullEols)
+    self.assertEqual(incTokens, fullTokens)
+  
+  def test_eol_position(self):
+    # EOL is at the start of the next line
+    lexer = IncrementalLexer(self.grammar)
+    lexer.convert('a = 1\n  b = 2\n')
+    eols = [token[3:5] for token in lexTokens(lexer) if (token[0] == 'EOL')]
+    self.assertEqual(eols, [(2, 0), (3, 0)])
+  
+  def test_convert_matches_full(self):
+    for filename in FILES:
+      with self.subTest(filename=filename):
+        text = readFile(filename)
+        lexer = IncrementalLexer(self.grammar)
+        lexer.convert(text)
+        self.assertSameTokens(lexTokens(lexer), self.fullTokens(text))
+  
+  def test_edit_matches_full(self):
+    for filename in FILES:
+      with self.subTest(filename=filename):
+        text = readFile(filename)
+        lexer = IncrementalLexer(self.grammar)
+        lexer.convert(text)
+        for firstLine, lastLine, newText in EDITS:
+          text = applyEdit(text, firstLine, lastLine, newText)
+          lexer.edit(firstLine, lastLine, newText)
+          self.assertSameTokens(lexTokens(lexer), self.fullTokens(text))
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,138 @@
+#Regression corpus for the string, comment and bit literal scanners. Each
+#input used to backtrack in the token regexes, it must now lex in bounded
+#time. Run with: python -m unittest discover tests
+import os
+import re
+import sys
+import time
+import unittest
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'fdl'))
+
+from Lexer import Lexer
+
+GRAMMAR_FILE = os.path.join(ROOT, 'builtin', 'grammer-fdl.yaml')
+
+# Seconds allowed per input, linear scans finish in milliseconds
+TIME_BOUND = 2.0
+
+# Size of generated inputs
+N = 100000
+
+# (name, text, lexes) lexes is False when the input is rejected
+CORPUS = [
+  ('string_long',            'a = "' + 'a'*N + '"\n',              True),
+  ('string_unterminated',    'a = "' + 'a'*N + '\n',               False),
+  ('string_escaped_quotes',  'a = "' + '\\"'*N + '"\n',            True),
+  ('string_escaped_open',    'a = "' + '\\"'*N + '\n',             False),
+  ('string_backslashes',     'a = "' + '\\'*(2*N) + '"\n',         True),
+  ('string_backslash_quote', 'a = "' + '\\'*(2*N+1) + '"\n',       False),
+  ('string_many',            'a = ' + '"a" '*N + '\n',              True),
+  ('bin_long',               "a = b'" + '01ZXLH_-'*N + "'\n",      True),
+  ('bin_unterminated',       "a = b'" + '0'*N + '\n',              False),
+  ('bin_bad_digit_end',      "a = b'" + '0'*N + "2'\n",            False),
+  ('bin_no_prefix',          "a = '" + '1'*N + "'\n",              True),
+  ('bin_many',               'a = ' + "b'0' "*N + '\n',            True),
+  ('hex_long',               "a = x'" + '0123456789abcdefABCDEF'*N + "'\n", True),
+  ('hex_unterminated',       "a = x'" + 'f'*N + '\n',              False),
+  ('hex_bad_digit_end',      "a = x'" + 'f'*N + "g'\n",            False),
+  ('comment_long',           '#' + '#"\'x'*N + '\n',               True),
+  ('comment_header_long',    '#!' + '"'*N + '\n',                  True),
+  ('many_lines',             'a = "s" # c\n'*(N//10),              True),
+]
+
+def loadGrammar():
+  fo = open(GRAMMAR_FILE, 'r')
+  config = yaml.safe_load(fo)
+  fo.close()
+  return config
+
+def lexAll(lexer, text):
+  # Lex whole text, return number of tokens
+  lexer.convert(text)
+  numTokens = 0
+  while not lexer.complete:
+    lexer.get()
+    numTokens += 1
+  return numTokens
+
+class TestPathologicalInputs(unittest.TestCase):
+  @classmethod
+  def setUpClass(cls):
+    cls.grammar = loadGrammar()
+  
+  def test_corpus_time_bound(self):
+    lexer = Lexer(self.grammar)
+    for name, text, lexes in CORPUS:
+      with self.subTest(name=name):
+        start = time.perf_counter()
+        try:
+          lexAll(lexer, text)
+          lexed = True
+        except Exception:
+          lexed = False
+        elapsed = time.perf_counter() - start
+        
+        self.assertEqual(lexed, lexes)
+        self.assertLess(elapsed, TIME_BOUND)
+
+class TestTokenRegex(unittest.TestCase):
+  @classmethod
+  def setUpClass(cls):
+    grammar = loadGrammar()
+    cls.regex = {}
+    for token in grammar['tokens']:
+      cls.regex[token['type']] = re.compile(token['regex'])
+    cls.lexer = Lexer(grammar)
+  
+  def tokenTypes(self, text):
+    # Token type names of one line, whitespace and EOL dropped
+    self.lexer.convert(text)
+    types = []
+    while not self.lexer.complete:
+      token = self.lexer.get()
+      types.append(self.lexer.kindNames[token.kind])
+    return [t for t in types if t not in ('EOL', 'EOF')]
+  
+  def test_string_match(self):
+    for text in ['""', '"a"', '"a b"', '"a\\"b"', '"\\\\"', '"\\n\\t"', '"\'"']:
+      with self.subTest(text=text):
+        self.assertIsNotNone(self.regex['STRING'].fullmatch(text))
+  
+  def test_string_no_match(self):
+    for text in ['"', '"a', '"a\\"', '"\\\\\\"', 'a"', '"a"b"']:
+      with self.subTest(text=text):
+        self.assertIsNone(self.regex['STRING'].fullmatch(text))
+  
+  def test_bin_match(self):
+    for text in ["'0'", "'01'", "b'01ZX'", "b'LH_-'", "'0_1'"]:
+      with self.subTest(text=text):
+        self.assertIsNotNone(self.regex['BIT_INIT_BIN'].fullmatch(text))
+  
+  def test_bin_no_match(self):
+    for text in ["''", "b''", "'2'", "b'0[1'", "'0^'", "'01", "x'01'", "B'01'"]:
+      with self.subTest(text=text):
+        self.assertIsNone(self.regex['BIT_INIT_BIN'].fullmatch(text))
+  
+  def test_scanner_agrees_with_regex(self):
+    # Dedicated scanners produce the same tokens as the grammar regexes
+    cases = [
+      ('a = "a\\"b"\n',  'STRING'),
+      ('a = b\'01ZX\'\n', 'BIT_INIT_BIN'),
+      ("a = '0_1'\n",    'BIT_INIT_BIN'),
+      ("a = x'fF0'\n",   'BIT_INIT_HEX'),
+    ]
+    for text, tokenType in cases:
+      with self.subTest(text=text):
+        self.assertEqual(self.tokenTypes(text)[-1], tokenType)
+  
+  def test_id_not_bit_literal(self):
+    # IDs starting with x or b are not bit literals
+    for text in ['a = b\n', 'a = x\n', 'a = bx1\n']:
+      with self.subTest(text=text):
+        self.assertEqual(self.tokenTypes(text)[-1], 'ID')
+
+if __name__ == '__main__':
+  unittest.main()
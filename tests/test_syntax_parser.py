@@ -0,0 +1,81 @@
+#Parser tests for constant literals and aggregates.
+#Run with: python -m unittest discover tests
+import contextlib
+import io
+import os
+import sys
+import unittest
+import numpy as np
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'fdl'))
+
+from Lexer import Lexer
+from SyntaxParser import SyntaxParser, ParseError, determineBits
+from ASTSchema import bitString
+
+GRAMMAR_FILE = os.path.join(ROOT, 'builtin', 'grammer-fdl.yaml')
+
+def loadGrammar():
+  fo = open(GRAMMAR_FILE, 'r')
+  config = yaml.safe_load(fo)
+  fo.close()
+  return config
+
+class TestConstLiterals(unittest.TestCase):
+  @classmethod
+  def setUpClass(cls):
+    cls.grammar = loadGrammar()
+  
+  def parseDecl(self, declStr):
+    # Parse a single declaration in a library, return its DECL node
+    text = 'library t:\n  {0}\n'.format(declStr)
+    with contextlib.redirect_stdout(io.StringIO()):
+      fileNode = SyntaxParser(Lexer(self.grammar)).parse(text, 't.fdl', None)
+    return fileNode.nodes[0].nodes[0]
+  
+  def test_bit_literal_separator(self):
+    # '_' separates digits, it is not a bit
+    for literal, bits in [("'0_1'", '01'), ("b'1_0Z_'", '10Z'), ("'0_0_1_1'", '0011')]:
+      with self.subTest(literal=literal):
+        value = self.parseDecl('bit[4] c = {0}'.format(literal)).value
+        self.assertEqual(value.base, 'BITS')
+        self.assertEqual(value.width, len(bits))
+        self.assertEqual(bitString(value), bits)
+  
+  def test_bit_literal_single(self):
+    value = self.parseDecl("bit c = '1_'").value
+    self.assertEqual(value.base, 'CONST')
+    self.assertEqual(value.value, '1')
+  
+  def test_bit_literal_no_bits(self):
+    with self.assertRaises(ParseError):
+      self.parseDecl("bit c = '_'")
+  
+  def test_const_array_int(self):
+    value = self.parseDecl('sint[3] c = [-1, 0, 9223372036854775807]').value
+    self.assertEqual(value.base, 'CONST_ARRAY')
+    self.assertEqual(value.value.dtype, np.int64)
+    self.assertEqual(value.value.tolist(), [-1, 0, 2**63-1])
+    self.assertEqual(value.typeName.name, ['sint'])
+    self.assertEqual(value.params, [determineBits(2**63-1)])
+  
+  def test_const_array_float(self):
+    value = self.parseDecl('float[2] c = [2.5, -1.0]').value
+    self.assertEqual(value.base, 'CONST_ARRAY')
+    self.assertEqual(value.value.dtype, np.float64)
+    self.assertEqual(value.value.tolist(), [2.5, -1.0])
+    self.assertEqual(value.typeName.name, ['float'])
+    self.assertEqual(value.params, [])
+  
+  def test_const_array_fallback(self):
+    # Mixed kinds and integers outside int64 load as AGGREGATE
+    for aggStr in ['[2.5, 1]', '[1, 2.5]', '[-1, 9223372036854775808]', '[-9223372036854775809, 0]']:
+      with self.subTest(aggStr=aggStr):
+        value = self.parseDecl('sint[2] c = {0}'.format(aggStr)).value
+        self.assertEqual(value.base, 'AGGREGATE')
+        self.assertEqual(len(value.elem), 2)
+
+if __name__ == '__main__':
+  unittest.main()